@@ -0,0 +1,2 @@
+# api/_lib
+# Módulos de apoio compartilhados pelas funções em api/*.py (não são endpoints)
@@ -0,0 +1,185 @@
+# api/_lib/backtest.py
+# Backtest do filtro HT sobre o warehouse local: reproduz cada jogo do intervalo só com o que existia
+# antes do apito (histórico point-in-time), pontua tudo num lote e cruza com o resultado real do 1º tempo.
+# Cada time vira uma linha do tempo cronológica com somas prefixadas; a janela `last` antes de um
+# kickoff é um bisect + duas subtrações, sem consulta por jogo e sem nenhuma chamada ao upstream.
+
+import bisect
+
+class Timeline:
+    def __init__(self):
+        self.kickoffs = []
+        self._scored = [0]
+        self._shots_sum = [0.0]
+        self._shots_count = [0]
+
+    def add(self, kickoff, scored, shots):
+        # chamadas em ordem cronológica (fixtures_between já vem ordenado)
+        self.kickoffs.append(kickoff)
+        self._scored.append(self._scored[-1] + (1 if scored else 0))
+        if shots is None:
+            self._shots_sum.append(self._shots_sum[-1])
+            self._shots_count.append(self._shots_count[-1])
+        else:
+            self._shots_sum.append(self._shots_sum[-1] + shots)
+            self._shots_count.append(self._shots_count[-1] + 1)
+
+    def window(self, before, last):
+        # os `last` jogos anteriores a `before`: mesmos valores de compute_ht_goal_pct_from_last_fixtures
+        # e estimate_avg_shots_ht_from_fixtures sobre o histórico que a API devolveria naquele momento
+        end = bisect.bisect_left(self.kickoffs, before)
+        start = max(0, end - int(last))
+        k = end - start
+        count = self._shots_count[end] - self._shots_count[start]
+        return k, {
+            "ht_goal_pct": ((self._scored[end] - self._scored[start]) / k) if k else 0.0,
+            "avg_shots_ht": ((self._shots_sum[end] - self._shots_sum[start]) / count) if count else 0.0,
+        }
+
+def _kickoff(f):
+    try:
+        return int((f.get("fixture") or {}).get("timestamp") or 0)
+    except (TypeError, ValueError):
+        return 0
+
+def _team_id(f, side):
+    try:
+        return int(((f.get("teams") or {}).get(side) or {}).get("id"))
+    except (TypeError, ValueError):
+        return None
+
+def halftime_known(f):
+    halftime = (f.get("score") or {}).get("halftime") or {}
+    return halftime.get("home") is not None and halftime.get("away") is not None
+
+def build_timelines(fixtures, scored, shots, stats_by_fixture):
+    # scored(f, team_id) / shots(f, team_id, stats_by_fixture): as mesmas funções do filtro ao vivo
+    timelines = {}
+    for f in fixtures:
+        ts = _kickoff(f)
+        for side in ("home", "away"):
+            tid = _team_id(f, side)
+            if tid is None:
+                continue
+            tl = timelines.get(tid)
+            if tl is None:
+                tl = timelines[tid] = Timeline()
+            tl.add(ts, scored(f, tid), shots(f, tid, stats_by_fixture))
+    return timelines
+
+def replay(fixtures, start_ts, end_ts, last, min_history, scored, shots, stats_by_fixture, select=None):
+    # -> [(fixture, match)] dos jogos do intervalo com histórico suficiente dos dois lados, e
+    # {liga: info + total de jogos do intervalo}. O xG do próprio jogo fica em 0: antes do apito
+    # não há statistics dele
+    timelines = build_timelines(fixtures, scored, shots, stats_by_fixture)
+    empty = Timeline()
+    rows = []
+    leagues = {}
+    for f in fixtures:
+        ts = _kickoff(f)
+        if ts < start_ts or ts >= end_ts or not halftime_known(f):
+            continue
+        if select is not None and not select(f):
+            continue
+        league = f.get("league") or {}
+        entry = leagues.get(league.get("id"))
+        if entry is None:
+            entry = leagues[league.get("id")] = {"league_id": league.get("id"), "name": league.get("name"),
+                                                 "country": league.get("country"), "fixtures": 0}
+        entry["fixtures"] += 1
+        home_id, away_id = _team_id(f, "home"), _team_id(f, "away")
+        home_n, home = timelines.get(home_id, empty).window(ts, last)
+        away_n, away = timelines.get(away_id, empty).window(ts, last)
+        if min(home_n, away_n) < min_history:
+            continue
+        home["xG_ht"] = away["xG_ht"] = 0.0
+        # desfecho real: algum gol no 1º tempo
+        rows.append((f, {"home": home, "away": away, "actual": bool(scored(f, home_id) or scored(f, away_id))}))
+    return rows, leagues
+
+def _auc(pairs):
+    # área sob a curva ROC do score contra o desfecho (ranks médios nos empates); None sem as duas classes
+    positives = sum(1 for _, hit in pairs if hit)
+    negatives = len(pairs) - positives
+    if not positives or not negatives:
+        return None
+    ordered = sorted(pairs, key=lambda p: p[0])
+    rank_sum = 0.0
+    i = 0
+    while i < len(ordered):
+        j = i
+        while j + 1 < len(ordered) and ordered[j + 1][0] == ordered[i][0]:
+            j += 1
+        avg_rank = (i + j) / 2.0 + 1
+        rank_sum += avg_rank * sum(1 for p in ordered[i:j + 1] if p[1])
+        i = j + 1
+    return (rank_sum - positives * (positives + 1) / 2.0) / (positives * negatives)
+
+def _rate(num, den):
+    return round(num / den, 4) if den else None
+
+class Tally:
+    def __init__(self, bucket):
+        self.bucket = bucket
+        self.fixtures = 0
+        self.pairs = []  # (score, gol no HT)
+        self.passed = 0
+        self.hits = 0
+        self.buckets = {}
+
+    def add(self, score, passed, hit):
+        self.pairs.append((score, hit))
+        if passed:
+            self.passed += 1
+            self.hits += 1 if hit else 0
+        b = int(score // self.bucket)
+        slot = self.buckets.setdefault(b, [0, 0, 0.0])
+        slot[0] += 1
+        slot[1] += 1 if hit else 0
+        slot[2] += score
+
+    def report(self):
+        evaluated = len(self.pairs)
+        goals = sum(1 for _, hit in self.pairs if hit)
+        base_rate = _rate(goals, evaluated)
+        hit_rate = _rate(self.hits, self.passed)
+        auc = _auc(self.pairs)
+        return {
+            "fixtures": self.fixtures,
+            "evaluated": evaluated,
+            "coverage": _rate(evaluated, self.fixtures),
+            "pass": self.passed,
+            "pass_rate": _rate(self.passed, evaluated),
+            "hits": self.hits,
+            "hit_rate": hit_rate,
+            "base_rate": base_rate,
+            "lift": round(hit_rate / base_rate, 4) if hit_rate is not None and base_rate else None,
+            "auc": round(auc, 4) if auc is not None else None,
+            # score não é probabilidade: cada faixa mostra a taxa observada de gol no HT
+            "calibration": [
+                {"score_min": b * self.bucket, "score_max": (b + 1) * self.bucket, "n": n,
+                 "hit_rate": _rate(hits, n), "mean_score": round(total / n, 2)}
+                for b, (n, hits, total) in sorted(self.buckets.items())
+            ],
+        }
+
+def summarize(rows, leagues, bucket=20):
+    # rows: [(fixture, match com _filter e actual)]; leagues: o segundo retorno de replay
+    overall = Tally(bucket)
+    tallies = {lid: Tally(bucket) for lid in leagues}
+    for lid, entry in leagues.items():
+        tallies[lid].fixtures = entry["fixtures"]
+        overall.fixtures += entry["fixtures"]
+    for f, m in rows:
+        flt = m["_filter"]
+        overall.add(flt["score"], flt["pass"], m["actual"])
+        tallies[(f.get("league") or {}).get("id")].add(flt["score"], flt["pass"], m["actual"])
+    out = overall.report()
+    # ligas sem nenhum jogo avaliável também aparecem (cobertura 0)
+    per_league = []
+    for lid, entry in leagues.items():
+        row = {k: v for k, v in entry.items() if k != "fixtures"}
+        row.update(tallies[lid].report())
+        per_league.append(row)
+    out["leagues"] = sorted(per_league, key=lambda r: (-r["evaluated"], str(r["league_id"])))
+    return out
@@ -0,0 +1,358 @@
+# api/_lib/cache.py
+# Cache em memória do processo com limite de tamanho (LRU) e TTL por entrada, e backends
+# compartilhados entre instâncias (SQLite local ou servidor com protocolo do Redis) atrás
+# da mesma interface: get/set/get_many/set_many/prefetch/delete/clear/stats
+
+import os
+import json
+import contextvars
+import sqlite3
+import tempfile
+import threading
+import time
+import logging
+import zlib
+from collections import OrderedDict
+
+from . import resp
+
+log = logging.getLogger(__name__)
+
+# backend compartilhado: memory (só o LRU do processo), sqlite ou redis
+CACHE_BACKEND = os.environ.get("FILTRO_CACHE_BACKEND", "memory").lower()
+CACHE_PATH = os.environ.get("FILTRO_CACHE_PATH", os.path.join(tempfile.gettempdir(), "filtro_cache.sqlite3"))
+CACHE_URL = os.environ.get("FILTRO_CACHE_URL", "redis://127.0.0.1:6379/0")
+CACHE_PREFIX = os.environ.get("FILTRO_CACHE_PREFIX", "filtro")
+# valores serializados a partir deste tamanho (bytes) vão comprimidos com zlib
+COMPRESS_MIN = int(os.environ.get("FILTRO_CACHE_COMPRESS_MIN", 1024))
+
+class TTLCache:
+    def __init__(self, maxsize=1024):
+        self.maxsize = max(1, int(maxsize))
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None, count=True):
+        # count=False: consulta de aquecimento (prefetch), que não entra em hits/misses
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += count
+                return default
+            expires_at, value = item
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                self.misses += count
+                return default
+            self._data.move_to_end(key)
+            self.hits += count
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires_at = (time.monotonic() + ttl) if ttl is not None else None
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def get_many(self, keys):
+        # só as chaves encontradas
+        out = {}
+        for key in keys:
+            value = self.get(key)
+            if value is not None:
+                out[key] = value
+        return out
+
+    def set_many(self, items, ttl=None):
+        for key, value in items.items():
+            self.set(key, value, ttl)
+
+    def prefetch(self, keys):
+        # só o processo: nada a aquecer
+        pass
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+def encode_value(value, expires_at=None):
+    # JSON + expiração absoluta (relógio de parede, comum às instâncias); zlib acima de COMPRESS_MIN
+    raw = json.dumps({"e": expires_at, "v": value}, separators=(",", ":")).encode("utf-8")
+    if len(raw) >= COMPRESS_MIN:
+        return b"z" + zlib.compress(raw, 6)
+    return b"j" + raw
+
+def decode_value(blob):
+    # (valor, expires_at) ou None para entrada ausente/vencida/ilegível
+    if not blob:
+        return None
+    try:
+        raw = zlib.decompress(blob[1:]) if blob[:1] == b"z" else blob[1:]
+        data = json.loads(raw)
+    except (ValueError, zlib.error):
+        return None
+    expires_at = data.get("e")
+    if expires_at is not None and expires_at <= time.time():
+        return None
+    return data.get("v"), expires_at
+
+class _BackendCounters:
+    def __init__(self):
+        self.errors = 0
+        self.bytes_written = 0
+
+class SQLiteCache:
+    # arquivo local compartilhado pelos processos da máquina; chaves já vêm com namespace
+    def __init__(self, path=CACHE_PATH):
+        self.path = path
+        self._local = threading.local()
+        self.counters = _BackendCounters()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS cache_kv (key TEXT PRIMARY KEY, expires_at REAL, value BLOB)")
+            self._local.conn = conn
+        return conn
+
+    def get_many(self, keys):
+        keys = list(keys)
+        out = {}
+        try:
+            conn = self._conn()
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                rows = conn.execute(
+                    f"SELECT key, value FROM cache_kv WHERE key IN ({','.join('?' * len(chunk))})", chunk)
+                out.update((k, v) for k, v in rows)
+        except sqlite3.Error:
+            log.exception("cache sqlite: leitura falhou")
+            self.counters.errors += 1
+        return out
+
+    def set_many(self, blobs, ttl=None):
+        expires_at = (time.time() + ttl) if ttl is not None else None
+        try:
+            with self._conn() as conn:
+                conn.executemany("INSERT OR REPLACE INTO cache_kv VALUES (?,?,?)",
+                                 [(k, expires_at, sqlite3.Binary(v)) for k, v in blobs.items()])
+            self.counters.bytes_written += sum(len(v) for v in blobs.values())
+        except sqlite3.Error:
+            log.exception("cache sqlite: escrita falhou")
+            self.counters.errors += 1
+
+    def delete(self, key):
+        try:
+            with self._conn() as conn:
+                conn.execute("DELETE FROM cache_kv WHERE key = ?", (key,))
+        except sqlite3.Error:
+            self.counters.errors += 1
+
+    def clear(self, prefix):
+        try:
+            with self._conn() as conn:
+                conn.execute("DELETE FROM cache_kv WHERE key LIKE ? ESCAPE '\\'",
+                             (prefix.replace("%", "\\%").replace("_", "\\_") + "%",))
+                # aproveita para varrer o que já venceu
+                conn.execute("DELETE FROM cache_kv WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),))
+        except sqlite3.Error:
+            self.counters.errors += 1
+
+class RedisCache:
+    # servidor com protocolo do Redis: MGET para leitura em lote, pipeline de SET PX para escrita
+    def __init__(self, url=CACHE_URL):
+        self.client = resp.Client(url)
+        self.counters = _BackendCounters()
+
+    def get_many(self, keys):
+        keys = list(keys)
+        if not keys:
+            return {}
+        try:
+            values = self.client.execute("MGET", *keys)
+        except (OSError, ConnectionError, resp.RespError):
+            log.warning("cache redis: MGET falhou", exc_info=True)
+            self.counters.errors += 1
+            return {}
+        return {k: v for k, v in zip(keys, values or []) if v is not None}
+
+    def set_many(self, blobs, ttl=None):
+        commands = []
+        for k, v in blobs.items():
+            cmd = ["SET", k, v]
+            if ttl is not None:
+                cmd += ["PX", max(1, int(ttl * 1000))]
+            commands.append(cmd)
+        try:
+            replies = self.client.pipeline(commands)
+        except (OSError, ConnectionError):
+            log.warning("cache redis: SET falhou", exc_info=True)
+            self.counters.errors += 1
+            return
+        self.counters.errors += sum(1 for r in replies if isinstance(r, resp.RespError))
+        self.counters.bytes_written += sum(len(v) for v in blobs.values())
+
+    def delete(self, key):
+        try:
+            self.client.execute("DEL", key)
+        except (OSError, ConnectionError, resp.RespError):
+            self.counters.errors += 1
+
+    def clear(self, prefix):
+        try:
+            cursor = b"0"
+            while True:
+                cursor, keys = self.client.execute("SCAN", cursor, "MATCH", prefix + "*", "COUNT", 500)
+                if keys:
+                    self.client.execute("DEL", *keys)
+                if cursor in (b"0", "0"):
+                    break
+        except (OSError, ConnectionError, resp.RespError):
+            self.counters.errors += 1
+
+# chaves do backend que o prefetch da requisição já buscou sem achar: o get seguinte não
+# volta ao backend por elas (before_request chama start_request)
+_request_misses = contextvars.ContextVar("filtro_cache_misses", default=None)
+
+def start_request():
+    _request_misses.set(set())
+
+class TieredCache:
+    # LRU do processo na frente de um backend compartilhado. O backend guarda JSON (encode/decode
+    # convertem objetos como TeamFeatures); o LRU guarda o objeto pronto
+    def __init__(self, local, shared, namespace, encode=None, decode=None, backend=""):
+        self.local = local
+        self.shared = shared
+        self.namespace = namespace
+        self.encode = encode or (lambda v: v)
+        self.decode = decode or (lambda v: v)
+        self.backend = backend
+        self.shared_hits = 0
+        self.shared_misses = 0
+
+    def _key(self, key):
+        return f"{CACHE_PREFIX}:{self.namespace}:{json.dumps(key, separators=(',', ':'))}"
+
+    def _load(self, missing):
+        # missing: chave do backend -> chave local; uma única ida (MGET / SELECT ... IN)
+        blobs = self.shared.get_many(list(missing))
+        now = time.time()
+        out = {}
+        for skey, key in missing.items():
+            decoded = decode_value(blobs.get(skey))
+            if decoded is None:
+                self.shared_misses += 1
+                continue
+            self.shared_hits += 1
+            value = self.decode(decoded[0])
+            expires_at = decoded[1]
+            self.local.set(key, value, (expires_at - now) if expires_at is not None else None)
+            out[key] = value
+        return out
+
+    def get(self, key, default=None):
+        value = self.local.get(key)
+        if value is not None:
+            return value
+        skey = self._key(key)
+        missed = _request_misses.get()
+        if missed is not None and skey in missed:
+            return default
+        return self._load({skey: key}).get(key, default)
+
+    def get_many(self, keys):
+        out = self.local.get_many(keys)
+        missing = {self._key(k): k for k in keys if k not in out}
+        if missing:
+            out.update(self._load(missing))
+        return out
+
+    def prefetch(self, keys):
+        # aquece o LRU com as chaves do slate numa única ida ao backend antes do fan-out; a consulta
+        # ao LRU não conta como hit/miss (o get de cada chave conta) e o que o backend não tem fica
+        # lembrado até o fim da requisição
+        missing = {self._key(k): k for k in keys if self.local.get(k, count=False) is None}
+        if not missing:
+            return
+        found = self._load(missing)
+        missed = _request_misses.get()
+        if missed is not None:
+            missed.update(skey for skey, k in missing.items() if k not in found)
+
+    def set(self, key, value, ttl=None):
+        self.set_many({key: value}, ttl)
+
+    def set_many(self, items, ttl=None):
+        self.local.set_many(items, ttl)
+        expires_at = (time.time() + ttl) if ttl is not None else None
+        blobs = {self._key(k): encode_value(self.encode(v), expires_at) for k, v in items.items()}
+        self.shared.set_many(blobs, ttl)
+        missed = _request_misses.get()
+        if missed is not None:
+            missed.difference_update(blobs)
+
+    def delete(self, key):
+        self.local.delete(key)
+        self.shared.delete(self._key(key))
+
+    def clear(self):
+        self.local.clear()
+        self.shared.clear(f"{CACHE_PREFIX}:{self.namespace}:")
+
+    def __len__(self):
+        return len(self.local)
+
+    def stats(self):
+        out = self.local.stats()
+        out["shared"] = {
+            "backend": self.backend,
+            "hits": self.shared_hits,
+            "misses": self.shared_misses,
+            # erros e bytes são do backend inteiro (todos os namespaces)
+            "errors": self.shared.counters.errors,
+            "bytes_written": self.shared.counters.bytes_written,
+        }
+        return out
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+def _shared_backend(name):
+    # um backend por processo, compartilhado por todos os caches (namespaces diferentes)
+    with _shared_lock:
+        if name not in _shared:
+            _shared[name] = SQLiteCache() if name == "sqlite" else RedisCache()
+        return _shared[name]
+
+def make_cache(namespace, maxsize, encode=None, decode=None, backend=None):
+    # memory: só TTLCache; sqlite/redis: TTLCache + backend compartilhado entre instâncias.
+    # Valores precisam ser serializáveis em JSON (ou ter encode/decode)
+    backend = (backend or CACHE_BACKEND).lower()
+    if backend not in ("sqlite", "redis"):
+        return TTLCache(maxsize)
+    return TieredCache(TTLCache(maxsize), _shared_backend(backend), namespace, encode, decode, backend)
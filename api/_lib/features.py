@@ -0,0 +1,66 @@
+# api/_lib/features.py
+# Feature store por time: a partir de um único histórico (mais recente primeiro) guarda somas
+# prefixadas de "marcou no 1º tempo" e do proxy de finalizações no HT, de modo que qualquer
+# janela `last` vira uma consulta O(1). A chave inclui um hash dos ids do histórico, então a
+# entrada é invalidada sozinha quando o time joga de novo.
+
+import hashlib
+
+from . import teamstats
+from .warehouse import fixture_id_of
+
+class TeamFeatures:
+    def __init__(self, scored, shots):
+        # scored: lista de bool; shots: lista de float ou None (jogo sem statistics)
+        self.size = len(scored)
+        self._scored = [0]
+        self._shots_sum = [0.0]
+        self._shots_count = [0]
+        for flag, val in zip(scored, shots):
+            self._scored.append(self._scored[-1] + (1 if flag else 0))
+            if val is None:
+                self._shots_sum.append(self._shots_sum[-1])
+                self._shots_count.append(self._shots_count[-1])
+            else:
+                self._shots_sum.append(self._shots_sum[-1] + val)
+                self._shots_count.append(self._shots_count[-1] + 1)
+
+    def _k(self, last):
+        return max(0, min(int(last), self.size))
+
+    def ht_goal_pct(self, last):
+        k = self._k(last)
+        return (self._scored[k] / k) if k else 0.0
+
+    def avg_shots_ht(self, last):
+        k = self._k(last)
+        count = self._shots_count[k]
+        return (self._shots_sum[k] / count) if count else 0.0
+
+    def window(self, last):
+        return {"ht_goal_pct": self.ht_goal_pct(last), "avg_shots_ht": self.avg_shots_ht(last)}
+
+    def to_payload(self):
+        # as próprias somas prefixadas (JSON) para o cache compartilhado
+        return {"scored": self._scored, "shots_sum": self._shots_sum, "shots_count": self._shots_count}
+
+    @classmethod
+    def from_payload(cls, data):
+        feats = cls.__new__(cls)
+        feats._scored = list(data["scored"])
+        feats._shots_sum = list(data["shots_sum"])
+        feats._shots_count = list(data["shots_count"])
+        feats.size = len(feats._scored) - 1
+        return feats
+
+def feature_key(team_id, history, stats_by_fixture):
+    # os ids do histórico (na ordem) e quais deles têm statistics entram por hash: a janela que veio
+    # do índice de liga (só aquela competição) ou com lotes de statistics cortados pelo deadline não
+    # reaproveita features calculadas sobre outro histórico
+    digest = hashlib.sha1()
+    for f in history or []:
+        fid = fixture_id_of(f)
+        has_stats = bool(f.get("statistics") or (stats_by_fixture or {}).get(fid))
+        digest.update(f"{fid}:{int(has_stats)};".encode())
+    # a versão das statistics normalizadas entra na chave: proxy de finalizações novo, features novas
+    return (int(team_id), len(history or []), digest.hexdigest()[:16], teamstats.VERSION)
@@ -0,0 +1,137 @@
+# api/_lib/keypool.py
+# Pool de chaves da API-Football: API_FOOTBALL_KEYS="k1,k2,..." (e/ou API_FOOTBALL_KEY). Cada chave tem
+# o seu token bucket, corrigido pelos headers de rate limit das respostas dela; cada chamada vai para
+# a chave com mais saldo, e a que responde 429/403 fica de fora por um cooldown.
+# Diagnóstico só com rótulo (#1, #2, ...) e um prefixo do SHA-256 — nunca a chave.
+
+import hashlib
+import os
+import threading
+import time
+from collections import Counter
+
+from . import ratelimit
+
+KEY_HEADER = "x-apisports-key"
+# 429 sem Retry-After: limite por minuto estourado; 403: chave suspensa/inválida ou plano sem acesso
+COOLDOWN_429 = float(os.environ.get("KEY_COOLDOWN_429", 60))
+COOLDOWN_403 = float(os.environ.get("KEY_COOLDOWN_403", 3600))
+
+class Key:
+    def __init__(self, index, secret, bucket=None):
+        self.label = f"#{index}"
+        self.fingerprint = hashlib.sha256(secret.encode("utf-8")).hexdigest()[:8]
+        self._secret = secret
+        self.bucket = bucket or ratelimit.TokenBucket()
+        self.calls = 0
+        self.status = Counter()
+        self.benched = 0
+        self.bench_reason = None
+        self.cooldown_until = 0.0
+
+    def headers(self):
+        return {KEY_HEADER: self._secret}
+
+    def cooling(self, now):
+        return now < self.cooldown_until
+
+    def __repr__(self):
+        # nunca a chave em logs/tracebacks
+        return f"<Key {self.label} {self.fingerprint}>"
+
+def parse_keys(value, single=None):
+    # vírgula, ponto e vírgula ou espaço; duplicadas entram uma vez, na ordem
+    out = []
+    for item in (value or "").replace(";", ",").replace(" ", ",").split(","):
+        item = item.strip()
+        if item and item not in out:
+            out.append(item)
+    if single and single.strip() and single.strip() not in out:
+        out.append(single.strip())
+    return out
+
+class KeyPool:
+    def __init__(self, secrets, first_bucket=None):
+        # a 1ª chave usa o bucket global (ratelimit.limiter): com uma chave só, nada muda
+        self.keys = [Key(i + 1, s, first_bucket if i == 0 else None) for i, s in enumerate(secrets)]
+        self._by_secret = {k._secret: k for k in self.keys}
+        self._lock = threading.Lock()
+        self.refused = 0
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __bool__(self):
+        return bool(self.keys)
+
+    def _rank(self, key, now):
+        # fora de cooldown, cota do dia não zerada, com token agora, mais saldo diário, mais tokens
+        tokens, daily = key.bucket.headroom()
+        exhausted = daily is not None and daily <= 0
+        return (not key.cooling(now), not exhausted, tokens >= 1, float("inf") if daily is None else daily, tokens)
+
+    def choose(self):
+        now = time.monotonic()
+        if len(self.keys) <= 1:
+            return self.keys[0] if self.keys else None
+        ranked = max(self.keys, key=lambda k: self._rank(k, now))
+        if ranked.cooling(now):
+            # todas de castigo: a que volta primeiro (o bucket/backoff seguram a tentativa)
+            return min(self.keys, key=lambda k: k.cooldown_until)
+        return ranked
+
+    def check_budget(self, priority=ratelimit.PRIORITY_NORMAL):
+        # prioridade baixa só é recusada quando nenhuma chave tem saldo acima da reserva
+        if priority != ratelimit.PRIORITY_LOW or not self.keys:
+            return
+        for key in self.keys:
+            try:
+                key.bucket.check_budget(priority)
+                return
+            except ratelimit.BudgetExhausted as e:
+                last = e
+        with self._lock:
+            self.refused += 1
+        raise last
+
+    def key_for(self, request_headers):
+        return self._by_secret.get((request_headers or {}).get(KEY_HEADER))
+
+    def observe(self, response, retry_after=None):
+        # cada resposta: cota da chave que a recebeu, contadores e cooldown em 429/403
+        key = self.key_for(response.request.headers if response.request is not None else None)
+        if key is None:
+            return None
+        key.bucket.update_from_headers(response.headers, response.status_code)
+        status = response.status_code
+        with self._lock:
+            key.calls += 1
+            key.status[status] += 1
+            if status in (429, 403):
+                cooldown = COOLDOWN_403 if status == 403 else (retry_after if retry_after is not None else COOLDOWN_429)
+                key.cooldown_until = max(key.cooldown_until, time.monotonic() + cooldown)
+                key.benched += 1
+                key.bench_reason = str(status)
+        return key
+
+    def snapshot(self):
+        now = time.monotonic()
+        keys = []
+        daily = []
+        with self._lock:
+            for k in self.keys:
+                entry = {"key": k.label, "fingerprint": k.fingerprint, "calls": k.calls,
+                         "status": {str(s): n for s, n in sorted(k.status.items())}, "benched": k.benched,
+                         "bench_reason": k.bench_reason,
+                         "cooldown_s": round(max(0.0, k.cooldown_until - now), 1)}
+                entry.update(k.bucket.snapshot())
+                keys.append(entry)
+                if entry["daily_remaining"] is not None:
+                    daily.append(entry["daily_remaining"])
+            refused = self.refused
+        return {"size": len(self.keys), "active": sum(1 for k in self.keys if not k.cooling(now)),
+                "daily_remaining": sum(daily) if daily else None, "refused": refused, "keys": keys}
+
+def from_env():
+    return KeyPool(parse_keys(os.environ.get("API_FOOTBALL_KEYS"), os.environ.get("API_FOOTBALL_KEY")),
+                   first_bucket=ratelimit.limiter)
@@ -0,0 +1,34 @@
+# api/_lib/lazy.py
+# Import adiado para o primeiro uso: no cold start da função só entra o que a requisição precisa
+# (uma resposta do cache, /testar ou /api/metrics não pagam o import de requests/numpy)
+
+import importlib
+import importlib.util
+import threading
+
+class LazyModule:
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        # o primeiro acesso pode vir de vários workers ao mesmo tempo
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        state = "carregado" if self._module is not None else "adiado"
+        return f"<LazyModule {self._name} ({state})>"
+
+def module(name, optional=False):
+    # optional=True: None quando o pacote não está instalado (checagem sem importar)
+    if optional and importlib.util.find_spec(name) is None:
+        return None
+    return LazyModule(name)
@@ -0,0 +1,45 @@
+# api/_lib/league_index.py
+# Índice por time montado a partir de uma liga/temporada inteira (/fixtures?league=X&season=Y).
+# Uma chamada cobre todos os times da competição; qualquer `last` vira um recorte local.
+
+from .warehouse import fixture_id_of, is_finished
+
+def _kickoff(f):
+    try:
+        return int((f.get("fixture") or {}).get("timestamp") or 0)
+    except (TypeError, ValueError):
+        return 0
+
+class LeagueIndex:
+    def __init__(self, fixtures):
+        self.by_team = {}
+        self.size = 0
+        seen = set()
+        for f in fixtures or []:
+            fid = fixture_id_of(f)
+            # só jogos encerrados entram no histórico; ids repetidos são ignorados
+            if not is_finished(f) or fid in seen:
+                continue
+            seen.add(fid)
+            self.size += 1
+            teams = f.get("teams") or {}
+            for side in ("home", "away"):
+                tid = (teams.get(side) or {}).get("id")
+                if tid:
+                    self.by_team.setdefault(int(tid), []).append(f)
+        for hist in self.by_team.values():
+            # mais recente primeiro, como get_last_fixtures_for_team
+            hist.sort(key=_kickoff, reverse=True)
+
+    def has_team(self, team_id):
+        return int(team_id) in self.by_team
+
+    def history(self, team_id, last, before=None):
+        hist = self.by_team.get(int(team_id), [])
+        if before is not None:
+            hist = [f for f in hist if _kickoff(f) < before]
+        return hist[:last]
+
+    def covers(self, team_id, last):
+        # só substitui a chamada por time se a liga tiver jogos suficientes para a janela
+        return len(self.by_team.get(int(team_id), [])) >= last
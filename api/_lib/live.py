@@ -0,0 +1,153 @@
+# api/_lib/live.py
+# Modo ao vivo: um único poll de /fixtures?live=all por intervalo (por instância, não por cliente),
+# diff contra o snapshot anterior (status, minuto, placar, placar do HT) e recomputação só dos jogos
+# que mudaram. Os clientes SSE esperam numa Condition e recebem os deltas numerados pela versão;
+# quem reconecta com Last-Event-ID recebe só o que perdeu (ou um snapshot, se ficou para trás demais).
+# Não há thread de fundo: o poll é feito por quem estiver esperando quando ele vence (serverless).
+
+import threading
+import time
+from collections import deque
+
+def _fid(f):
+    try:
+        return int((f.get("fixture") or {}).get("id"))
+    except (TypeError, ValueError):
+        return None
+
+def signature(f):
+    # o que muda durante o jogo e interessa ao cliente; o resto do payload é ignorado no diff
+    fx = f.get("fixture") or {}
+    status = fx.get("status") or {}
+    goals = f.get("goals") or {}
+    halftime = (f.get("score") or {}).get("halftime") or {}
+    return (status.get("short"), status.get("elapsed"), goals.get("home"), goals.get("away"),
+            halftime.get("home"), halftime.get("away"))
+
+def live_state(f):
+    fx = f.get("fixture") or {}
+    status = fx.get("status") or {}
+    return {
+        "status": status.get("short"),
+        "elapsed": status.get("elapsed"),
+        "goals": f.get("goals"),
+        "halftime": (f.get("score") or {}).get("halftime"),
+    }
+
+def diff(previous, fixtures):
+    # -> (jogos novos ou alterados, ids que saíram do live, assinaturas atuais)
+    current = {}
+    changed = []
+    for f in fixtures or []:
+        fid = _fid(f)
+        if fid is None:
+            continue
+        sig = signature(f)
+        current[fid] = sig
+        if previous.get(fid) != sig:
+            changed.append(f)
+    removed = [fid for fid in previous if fid not in current]
+    return changed, removed, current
+
+class Feed:
+    def __init__(self, fetch, evaluate, interval=15.0, backlog=256):
+        # fetch() -> fixtures ao vivo; evaluate(changed, known) -> {fixture_id: match} dos alterados,
+        # onde `known` são as saídas atuais (o avaliador reaproveita o que não depende do placar)
+        self._fetch = fetch
+        self._evaluate = evaluate
+        self.interval = float(interval)
+        self.version = 0
+        self.signatures = {}
+        self.matches = {}
+        self.polled_at = None
+        self.last_error = None
+        self._events = deque(maxlen=backlog)  # (versão, jogos alterados, ids removidos)
+        self._cond = threading.Condition()
+        self._poll_lock = threading.Lock()
+        self.counters = {"polls": 0, "changed": 0, "removed": 0, "errors": 0, "subscribers": 0}
+
+    def due(self):
+        return self.polled_at is None or time.monotonic() - self.polled_at >= self.interval
+
+    def poll(self):
+        try:
+            fixtures = self._fetch()
+            changed, removed, current = diff(self.signatures, fixtures)
+            updated = self._evaluate(changed, dict(self.matches)) if changed else {}
+        except Exception as e:
+            with self._cond:
+                self.polled_at = time.monotonic()
+                self.last_error = str(e)
+                self.counters["errors"] += 1
+            raise
+        with self._cond:
+            self.counters["polls"] += 1
+            self.polled_at = time.monotonic()
+            self.last_error = None
+            # jogo que falhou na avaliação (ex.: deadline) fica de fora da assinatura e volta no próximo poll
+            self.signatures = {fid: sig for fid, sig in current.items() if fid in updated or fid in self.matches}
+            if not updated and not removed:
+                return False
+            for fid in removed:
+                self.matches.pop(fid, None)
+            self.matches.update(updated)
+            self.version += 1
+            self._events.append((self.version, list(updated.values()), removed))
+            self.counters["changed"] += len(updated)
+            self.counters["removed"] += len(removed)
+            self._cond.notify_all()
+        return True
+
+    def maybe_poll(self):
+        # um poll por intervalo na instância: quem chega durante um poll em andamento só espera
+        if not self.due() or not self._poll_lock.acquire(blocking=False):
+            return False
+        try:
+            if not self.due():
+                return False
+            return self.poll()
+        finally:
+            self._poll_lock.release()
+
+    def snapshot(self):
+        with self._cond:
+            return self.version, list(self.matches.values())
+
+    def since(self, version):
+        # deltas com versão > `version`, ou None se parte deles já saiu do backlog (mandar snapshot)
+        with self._cond:
+            if version > self.version:
+                return None
+            events = [e for e in self._events if e[0] > version]
+            if self.version > version and (not events or events[0][0] != version + 1):
+                return None
+            return events
+
+    def wait(self, version, timeout):
+        # bloqueia até haver versão > `version`, fazendo o poll quando ele vence; False no timeout
+        end = time.monotonic() + timeout
+        while True:
+            try:
+                self.maybe_poll()
+            except Exception:
+                pass  # erro já contado; o cliente segue esperando o próximo intervalo
+            with self._cond:
+                if self.version > version:
+                    return True
+                remaining = end - time.monotonic()
+                if remaining <= 0:
+                    return False
+                next_poll = self.interval - (time.monotonic() - self.polled_at) if self.polled_at else 0
+                self._cond.wait(max(0.05, min(remaining, next_poll)))
+
+    def subscribe(self, delta):
+        with self._cond:
+            self.counters["subscribers"] += delta
+
+    def stats(self):
+        with self._cond:
+            out = dict(self.counters)
+            out.update({"version": self.version, "matches": len(self.matches), "interval": self.interval,
+                        "age_s": round(time.monotonic() - self.polled_at, 1) if self.polled_at else None,
+                        "last_error": self.last_error})
+        return out
@@ -0,0 +1,180 @@
+# api/_lib/metrics.py
+# Instrumentação: tempos por fase e por chamada ao upstream na requisição corrente (Server-Timing e
+# _meta.timings) e contadores/histogramas agregados da instância no formato texto do Prometheus
+
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+# segundos; o último bucket (+Inf) é implícito
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _labels(labels):
+    if not labels:
+        return ""
+    body = ",".join('%s="%s"' % (k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+                    for k, v in labels)
+    return "{" + body + "}"
+
+def _num(v):
+    if isinstance(v, bool):
+        return "1" if v else "0"
+    if isinstance(v, float):
+        return repr(round(v, 6))
+    return str(v)
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}    # name -> {labels: value}
+        self._histograms = {}  # name -> {labels: [bucket counts..., sum, count]}
+        self._help = {}
+        self._collectors = []
+
+    def describe(self, name, kind, text):
+        self._help[name] = (kind, text)
+
+    def inc(self, name, value=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            h = series.get(key)
+            if h is None:
+                h = series[key] = [0] * len(LATENCY_BUCKETS) + [0.0, 0]
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    h[i] += 1
+            h[-2] += seconds
+            h[-1] += 1
+
+    def collector(self, fn):
+        # fn() -> [(nome, tipo, ajuda, [(labels dict, valor)])], lido a cada render (ex.: stats de cache)
+        self._collectors.append(fn)
+        return fn
+
+    def render(self):
+        lines = []
+        with self._lock:
+            counters = {n: dict(s) for n, s in self._counters.items()}
+            histograms = {n: {k: list(h) for k, h in s.items()} for n, s in self._histograms.items()}
+        for name in sorted(counters):
+            kind, text = self._help.get(name, ("counter", name))
+            lines += [f"# HELP {name} {text}", f"# TYPE {name} {kind}"]
+            for key, value in sorted(counters[name].items()):
+                lines.append(f"{name}{_labels(key)} {_num(value)}")
+        for name in sorted(histograms):
+            kind, text = self._help.get(name, ("histogram", name))
+            lines += [f"# HELP {name} {text}", f"# TYPE {name} histogram"]
+            for key, h in sorted(histograms[name].items()):
+                for i, bound in enumerate(LATENCY_BUCKETS):
+                    lines.append(f"{name}_bucket{_labels(key + (('le', bound),))} {h[i]}")
+                lines.append(f"{name}_bucket{_labels(key + (('le', '+Inf'),))} {h[-1]}")
+                lines.append(f"{name}_sum{_labels(key)} {_num(h[-2])}")
+                lines.append(f"{name}_count{_labels(key)} {h[-1]}")
+        for fn in self._collectors:
+            try:
+                families = fn()
+            except Exception:
+                continue
+            for name, kind, text, samples in families:
+                lines += [f"# HELP {name} {text}", f"# TYPE {name} {kind}"]
+                for labels, value in samples:
+                    lines.append(f"{name}{_labels(tuple(sorted(labels.items())))} {_num(value)}")
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+registry.describe("filtro_requests_total", "counter", "Requisições atendidas por endpoint e status HTTP")
+registry.describe("filtro_request_duration_seconds", "histogram", "Duração das requisições por endpoint")
+registry.describe("filtro_phase_duration_seconds", "histogram", "Duração de cada fase do processamento")
+registry.describe("filtro_upstream_requests_total", "counter", "Tentativas de chamada à API-Football por path e status")
+registry.describe("filtro_upstream_bytes_total", "counter", "Bytes recebidos da API-Football por path")
+registry.describe("filtro_upstream_duration_seconds", "histogram", "Latência de cada tentativa ao upstream por path")
+
+class Timings:
+    # coletor da requisição corrente; compartilhado pelos workers do fan-out (copy_context)
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+        self.phases = {}
+        self.upstream = {"calls": 0, "bytes": 0, "ms": 0.0, "status": {}}
+
+    def add_phase(self, name, seconds):
+        with self._lock:
+            self.phases[name] = self.phases.get(name, 0.0) + seconds * 1000.0
+
+    def add_upstream(self, status, nbytes, seconds):
+        with self._lock:
+            up = self.upstream
+            up["calls"] += 1
+            up["bytes"] += nbytes
+            up["ms"] += seconds * 1000.0
+            up["status"][str(status)] = up["status"].get(str(status), 0) + 1
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.started) * 1000.0
+
+    def as_dict(self):
+        with self._lock:
+            out = {name: round(ms, 2) for name, ms in self.phases.items()}
+            up = dict(self.upstream, ms=round(self.upstream["ms"], 2), status=dict(self.upstream["status"]))
+        return {"phases_ms": out, "upstream": up, "total_ms": round(self.elapsed_ms(), 2)}
+
+    def server_timing(self):
+        # fases na ordem em que ocorreram; o tempo de upstream é somado entre workers (pode passar do total)
+        with self._lock:
+            parts = [f"{name};dur={ms:.1f}" for name, ms in self.phases.items()]
+            up = self.upstream
+            parts.append(f'upstream;desc="{up["calls"]} calls";dur={up["ms"]:.1f}')
+        parts.append(f"total;dur={self.elapsed_ms():.1f}")
+        return ", ".join(parts)
+
+_current = contextvars.ContextVar("filtro_timings", default=None)
+
+def start_request():
+    timings = Timings()
+    _current.set(timings)
+    return timings
+
+def current():
+    return _current.get()
+
+@contextmanager
+def phase(name):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - t0
+        registry.observe("filtro_phase_duration_seconds", seconds, phase=name)
+        timings = _current.get()
+        if timings is not None:
+            timings.add_phase(name, seconds)
+
+def record_upstream(path, status, nbytes, seconds):
+    registry.inc("filtro_upstream_requests_total", path=path, status=status)
+    registry.inc("filtro_upstream_bytes_total", nbytes, path=path)
+    registry.observe("filtro_upstream_duration_seconds", seconds, path=path)
+    timings = _current.get()
+    if timings is not None:
+        timings.add_upstream(status, nbytes, seconds)
+
+def record_request(endpoint, status, seconds):
+    registry.inc("filtro_requests_total", endpoint=endpoint, status=status)
+    registry.observe("filtro_request_duration_seconds", seconds, endpoint=endpoint)
+
+def stats_samples(stats, prefix=""):
+    # achata um dict de stats (números em qualquer nível) em pares (chave, valor)
+    out = []
+    for k, v in (stats or {}).items():
+        if isinstance(v, dict):
+            out += stats_samples(v, f"{prefix}{k}_")
+        elif isinstance(v, (int, float)):
+            out.append((prefix + k, v))
+    return out
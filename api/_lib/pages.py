@@ -0,0 +1,51 @@
+# api/_lib/pages.py
+# Página /testar servida como asset pré-comprimido: HTML (lido de public/testar.html) e gzip são
+# montados uma vez por instância, com ETag fixo e Cache-Control longo para a edge (o conteúdo só
+# muda a cada deploy)
+
+import gzip
+import hashlib
+import os
+
+PAGE_MAX_AGE = int(os.environ.get("TESTAR_MAX_AGE", 3600))
+PAGE_S_MAXAGE = int(os.environ.get("TESTAR_S_MAXAGE", 7 * 24 * 3600))
+
+# fonte única da página: public/testar.html, que a Vercel também serve como estático em /testar;
+# vercel.json inclui o arquivo no bundle das funções (includeFiles)
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+TESTAR_PATH = os.path.join(ROOT, "public", "testar.html")
+
+def _read(path):
+    with open(path, encoding="utf-8") as fh:
+        return fh.read()
+
+class StaticPage:
+    def __init__(self, html):
+        self.body = html.encode("utf-8")
+        self._gzip = None
+        self.etag = hashlib.sha256(self.body).hexdigest()[:32]
+
+    @property
+    def gzipped(self):
+        # mtime=0: mesmos bytes em toda instância
+        if self._gzip is None:
+            self._gzip = gzip.compress(self.body, compresslevel=9, mtime=0)
+        return self._gzip
+
+    def response(self, request):
+        from flask import Response
+        headers = {
+            "Cache-Control": f"public, max-age={PAGE_MAX_AGE}, s-maxage={PAGE_S_MAXAGE}, stale-while-revalidate=86400",
+            "Vary": "Accept-Encoding",
+        }
+        if "gzip" in (request.headers.get("Accept-Encoding") or ""):
+            resp = Response(self.gzipped, mimetype="text/html", headers=headers)
+            resp.headers["Content-Encoding"] = "gzip"
+            # ETag forte é por representação
+            resp.set_etag(self.etag + "-gz")
+        else:
+            resp = Response(self.body, mimetype="text/html", headers=headers)
+            resp.set_etag(self.etag)
+        return resp.make_conditional(request)
+
+testar = StaticPage(_read(TESTAR_PATH))
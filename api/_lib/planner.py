@@ -0,0 +1,134 @@
+# api/_lib/planner.py
+# Planejamento das chamadas ao upstream a partir do payload de /fixtures?date=, antes de qualquer
+# trabalho por jogo: decide quais históricos e statistics são realmente necessários.
+
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from .warehouse import fixture_id_of, fixture_status
+
+# jogo que não vai acontecer (ou não tem data): nem histórico nem statistics
+DEAD_STATUSES = {"PST", "CANC", "ABD", "AWD", "WO"}
+# jogo que ainda não começou: histórico sim, statistics nunca existem
+NOT_STARTED_STATUSES = {"NS", "TBD"}
+# após tantos jogos encerrados sem statistics, a liga/temporada é tratada como sem cobertura
+NO_COVERAGE_AFTER = 3
+# o que se aprendeu sobre a cobertura de uma liga/temporada vale por esse tempo (a API pode passar a
+# publicar statistics, ou as vazias eram só atraso)
+COVERAGE_TTL = float(os.environ.get("PLANNER_COVERAGE_TTL", 6 * 3600))
+
+_coverage = {}  # (league_id, season) -> (jogos encerrados consecutivos sem statistics (-1 = tem cobertura), visto em)
+_coverage_lock = threading.Lock()
+
+def _league_key(f):
+    league = f.get("league") or {}
+    return (league.get("id"), league.get("season"))
+
+def _misses(key, now):
+    entry = _coverage.get(key)
+    if entry is None or now - entry[1] >= COVERAGE_TTL:
+        return 0
+    return entry[0]
+
+def note_statistics(f, stats):
+    # aprende a cobertura de statistics por liga/temporada a partir dos jogos encerrados;
+    # só com busca bem-sucedida (falha, recusa ou deadline não dizem nada sobre a cobertura)
+    key = _league_key(f)
+    if key[0] is None:
+        return
+    now = time.time()
+    with _coverage_lock:
+        if stats:
+            _coverage[key] = (-1, now)
+        else:
+            misses = _misses(key, now)
+            if misses >= 0:
+                _coverage[key] = (misses + 1, now)
+
+def league_has_statistics(f):
+    with _coverage_lock:
+        return _misses(_league_key(f), time.time()) < NO_COVERAGE_AFTER
+
+class SlatePlan:
+    def __init__(self):
+        self.teams = OrderedDict()  # team_id -> {"priority": ..., "in_play": bool}
+        self.history_requested = 0
+        self.skip_history = set()
+        self.skip_statistics = {}  # fixture_id -> motivo
+        self.statistics = []
+        self.by_status = Counter()
+        self.from_league_index = 0
+        self.from_rolling = 0
+
+    def needs_history(self, fixture_id):
+        return fixture_id not in self.skip_history
+
+    def needs_statistics(self, fixture_id):
+        return fixture_id not in self.skip_statistics
+
+    def skip_statistics_of(self, fixture_ids, reason):
+        # ex.: modo ao vivo sem statistics do próprio jogo (uma chamada por poll)
+        ids = set(fixture_ids)
+        for fid in ids:
+            self.skip_statistics[fid] = reason
+        self.statistics = [fid for fid in self.statistics if fid not in ids]
+
+    def leagues(self):
+        # (league_id, season) distintos do slate, na ordem em que aparecem
+        return list(OrderedDict.fromkeys(t["league"] for t in self.teams.values() if t["league"][0] and t["league"][1]))
+
+    def summary(self):
+        reasons = Counter(self.skip_statistics.values())
+        return {
+            "fixtures": sum(self.by_status.values()),
+            "by_status": dict(self.by_status),
+            "history": {
+                "requested": self.history_requested,
+                "planned": len(self.teams),
+                "deduplicated": self.history_requested - len(self.teams),
+                "skipped_fixtures": len(self.skip_history),
+                "from_league_index": self.from_league_index,
+                "from_rolling": self.from_rolling,
+            },
+            "statistics": {
+                "planned": len(self.statistics),
+                "skipped": len(self.skip_statistics),
+                "skipped_by_reason": dict(reasons),
+            },
+        }
+
+def build_plan(fixtures, fixture_teams, priority_of, live_statuses, low_priority):
+    # fixture_teams/priority_of vêm do chamador (api/filtro.py) para manter um único critério
+    plan = SlatePlan()
+    for f in fixtures:
+        fid = fixture_id_of(f)
+        status = fixture_status(f)
+        plan.by_status[status or "?"] += 1
+        if status in DEAD_STATUSES:
+            plan.skip_history.add(fid)
+            plan.skip_statistics[fid] = "status"
+            continue
+        if status in NOT_STARTED_STATUSES:
+            plan.skip_statistics[fid] = "not_started"
+        elif not league_has_statistics(f):
+            plan.skip_statistics[fid] = "no_coverage"
+        elif fid:
+            plan.statistics.append(fid)
+        priority = priority_of(f)
+        in_play = status in live_statuses
+        for team in fixture_teams(f):
+            tid = team.get("id")
+            if not tid:
+                continue
+            plan.history_requested += 1
+            entry = plan.teams.get(tid)
+            if entry is None:
+                plan.teams[tid] = {"priority": priority, "in_play": in_play, "league": _league_key(f)}
+            else:
+                # o mesmo time em mais de um jogo: vale a maior urgência
+                entry["in_play"] = entry["in_play"] or in_play
+                if priority != low_priority:
+                    entry["priority"] = priority
+    return plan
@@ -0,0 +1,129 @@
+# api/_lib/ratelimit.py
+# Token bucket compartilhado por todas as chamadas ao upstream, semeado e corrigido pelos headers
+# de rate limit da API-Football:
+#   X-RateLimit-Limit / X-RateLimit-Remaining                 -> limite por minuto
+#   x-ratelimit-requests-limit / x-ratelimit-requests-remaining -> cota diária
+
+import os
+import threading
+import time
+
+PER_MINUTE = max(1, int(os.environ.get("RATE_LIMIT_PER_MINUTE", 10)))
+# abaixo desse saldo diário, chamadas de prioridade baixa são recusadas
+DAILY_RESERVE = max(0, int(os.environ.get("RATE_LIMIT_DAILY_RESERVE", 100)))
+
+PRIORITY_LOW = "low"
+PRIORITY_NORMAL = "normal"
+
+class BudgetExhausted(Exception):
+    # saldo diário abaixo da reserva para chamadas de prioridade baixa
+    pass
+
+def _int_header(headers, name):
+    try:
+        v = headers.get(name)
+        return int(v) if v not in (None, "") else None
+    except (TypeError, ValueError):
+        return None
+
+class TokenBucket:
+    def __init__(self, per_minute=PER_MINUTE, daily_reserve=DAILY_RESERVE):
+        self._cond = threading.Condition()
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0  # tokens por segundo
+        self.tokens = float(per_minute)
+        self.updated = time.monotonic()
+        self.daily_limit = None
+        self.daily_remaining = None
+        self.daily_reserve = daily_reserve
+        self.refused = 0
+        self.seeded = False
+        self.waited = 0.0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def check_budget(self, priority=PRIORITY_NORMAL):
+        with self._cond:
+            if (priority == PRIORITY_LOW and self.daily_remaining is not None
+                    and self.daily_remaining <= self.daily_reserve):
+                self.refused += 1
+                raise BudgetExhausted(f"saldo diário {self.daily_remaining} <= reserva {self.daily_reserve}")
+
+    def acquire(self, timeout=None):
+        # bloqueia até haver token: suaviza rajadas em vez de tomar 429. Com `timeout` (mesma
+        # assinatura do semáforo), devolve False se o token não chegaria a tempo
+        end = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    if self.daily_remaining is not None:
+                        self.daily_remaining = max(0, self.daily_remaining - 1)
+                    return True
+                wait = (1 - self.tokens) / self.rate
+                if end is not None and time.monotonic() + wait > end:
+                    return False
+                self.waited += wait
+                self._cond.wait(wait)
+
+    # permite usar o bucket diretamente como `gate` de session.get
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def update_from_headers(self, headers, status=None):
+        minute_limit = _int_header(headers, "X-RateLimit-Limit")
+        minute_remaining = _int_header(headers, "X-RateLimit-Remaining")
+        daily_limit = _int_header(headers, "x-ratelimit-requests-limit")
+        daily_remaining = _int_header(headers, "x-ratelimit-requests-remaining")
+        with self._cond:
+            self._refill()
+            if minute_limit:
+                self.capacity = float(minute_limit)
+                self.rate = minute_limit / 60.0
+            if minute_remaining is not None:
+                if not self.seeded:
+                    # primeira resposta do processo: semeia o bucket com o saldo real
+                    self.tokens = min(float(minute_remaining), self.capacity)
+                    self.seeded = True
+                else:
+                    # o servidor enxerga o consumo de todas as instâncias; só corrigimos para baixo
+                    self.tokens = min(self.tokens, float(minute_remaining), self.capacity)
+            if status == 429:
+                self.tokens = 0.0
+            if daily_limit is not None:
+                self.daily_limit = daily_limit
+            if daily_remaining is not None:
+                self.daily_remaining = daily_remaining
+            self._cond.notify_all()
+
+    def headroom(self):
+        # (tokens agora, saldo diário ou None) para escolher entre buckets de chaves diferentes
+        with self._cond:
+            self._refill()
+            return self.tokens, self.daily_remaining
+
+    def snapshot(self):
+        with self._cond:
+            self._refill()
+            return {
+                "tokens": round(self.tokens, 2),
+                "capacity": self.capacity,
+                "refill_per_sec": round(self.rate, 4),
+                "daily_limit": self.daily_limit,
+                "daily_remaining": self.daily_remaining,
+                "daily_reserve": self.daily_reserve,
+                "seeded": self.seeded,
+                "refused": self.refused,
+                "waited_s": round(self.waited, 3),
+            }
+
+# instância única por processo, compartilhada por todos os chamadores de fetcher
+limiter = TokenBucket()
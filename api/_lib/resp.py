@@ -0,0 +1,116 @@
+# api/_lib/resp.py
+# Cliente mínimo do protocolo do Redis (RESP2) sobre socket, sem dependência externa:
+# só o necessário para o cache compartilhado (GET/SET/MGET/DEL/SCAN e pipeline)
+
+import socket
+import threading
+from urllib.parse import urlparse, unquote
+
+class RespError(Exception):
+    pass
+
+def _encode(args):
+    out = [b"*%d\r\n" % len(args)]
+    for a in args:
+        if isinstance(a, str):
+            a = a.encode("utf-8")
+        elif isinstance(a, (int, float)):
+            a = str(a).encode("ascii")
+        out.append(b"$%d\r\n%s\r\n" % (len(a), a))
+    return b"".join(out)
+
+class Connection:
+    def __init__(self, host, port, db=0, password=None, username=None, timeout=2.0):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.reader = self.sock.makefile("rb")
+        if password:
+            self.execute(*(("AUTH", username, password) if username else ("AUTH", password)))
+        if db:
+            self.execute("SELECT", db)
+
+    def _read(self):
+        line = self.reader.readline()
+        if not line:
+            raise ConnectionError("conexão encerrada pelo servidor")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest.decode("utf-8")
+        if kind == b"-":
+            raise RespError(rest.decode("utf-8", "replace"))
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            n = int(rest)
+            if n < 0:
+                return None
+            data = self.reader.read(n + 2)
+            return data[:-2]
+        if kind == b"*":
+            n = int(rest)
+            return None if n < 0 else [self._read() for _ in range(n)]
+        raise RespError(f"resposta inesperada: {line[:40]!r}")
+
+    def execute(self, *args):
+        self.sock.sendall(_encode(args))
+        return self._read()
+
+    def pipeline(self, commands):
+        # um único envio, respostas lidas na ordem; erros de comando voltam como RespError na lista
+        if not commands:
+            return []
+        self.sock.sendall(b"".join(_encode(c) for c in commands))
+        out = []
+        for _ in commands:
+            try:
+                out.append(self._read())
+            except RespError as e:
+                out.append(e)
+        return out
+
+    def close(self):
+        try:
+            self.reader.close()
+            self.sock.close()
+        except OSError:
+            pass
+
+class Client:
+    # uma conexão por thread (os workers do fan-out usam o cache em paralelo)
+    def __init__(self, url, timeout=2.0):
+        u = urlparse(url)
+        self.host = u.hostname or "127.0.0.1"
+        self.port = u.port or 6379
+        self.db = int((u.path or "/0").lstrip("/") or 0)
+        self.username = unquote(u.username) if u.username else None
+        self.password = unquote(u.password) if u.password else None
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = Connection(self.host, self.port, self.db, self.password, self.username, self.timeout)
+            self._local.conn = conn
+        return conn
+
+    def _reset(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+        self._local.conn = None
+
+    def execute(self, *args):
+        try:
+            return self._conn().execute(*args)
+        except (OSError, ConnectionError):
+            # conexão quebrada não é reaproveitada; o chamador decide se trata como miss
+            self._reset()
+            raise
+
+    def pipeline(self, commands):
+        try:
+            return self._conn().pipeline(commands)
+        except (OSError, ConnectionError):
+            self._reset()
+            raise
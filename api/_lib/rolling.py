@@ -0,0 +1,191 @@
+# api/_lib/rolling.py
+# Agregados móveis por time: ring buffer de tamanho fixo com os últimos jogos encerrados e
+# contadores corridos (gols no HT, soma/contagem do proxy de finalizações). Quando um jogo
+# passa a encerrado, o ring descarta o mais antigo e inclui o novo em O(1).
+# Os rings são persistidos no warehouse para que uma instância fria os restaure.
+
+import os
+import threading
+import time
+from collections import deque
+
+from . import teamstats
+from . import warehouse
+
+CAPACITY = max(1, int(os.environ.get("ROLLING_SIZE", 10)))
+# por quanto tempo um ring semeado com o histórico completo é confiável sem nova sincronização;
+# o mesmo prazo do histórico no warehouse (WAREHOUSE_SYNC_TTL), nunca mais que ele
+TRUST_TTL = float(os.environ.get("ROLLING_TRUST_TTL", os.environ.get("WAREHOUSE_SYNC_TTL", 6 * 3600)))
+
+class TeamRing:
+    # mesma interface de features.TeamFeatures (size, ht_goal_pct, avg_shots_ht, window)
+    def __init__(self, team_id, capacity=CAPACITY, synced_at=None):
+        self.team_id = int(team_id)
+        self.capacity = capacity
+        self.synced_at = synced_at
+        self.entries = deque()  # (fixture_id, kickoff, scored, shots), mais recente primeiro
+        self.scored_count = 0
+        self.shots_sum = 0.0
+        self.shots_count = 0
+
+    @property
+    def size(self):
+        return len(self.entries)
+
+    def _add(self, entry):
+        self.scored_count += 1 if entry[2] else 0
+        if entry[3] is not None:
+            self.shots_sum += entry[3]
+            self.shots_count += 1
+
+    def _remove(self, entry):
+        self.scored_count -= 1 if entry[2] else 0
+        if entry[3] is not None:
+            self.shots_sum -= entry[3]
+            self.shots_count -= 1
+
+    def _rebuild(self):
+        self.scored_count = 0
+        self.shots_sum = 0.0
+        self.shots_count = 0
+        for e in self.entries:
+            self._add(e)
+
+    def contains(self, fixture_id):
+        return any(e[0] == fixture_id for e in self.entries)
+
+    def head(self):
+        # (fixture_id, kickoff) do jogo mais recente, ou None
+        return self.entries[0][:2] if self.entries else None
+
+    def push(self, fixture_id, kickoff, scored, shots):
+        # devolve True se o ring mudou
+        if self.contains(fixture_id):
+            return False
+        entry = (fixture_id, int(kickoff or 0), bool(scored), shots)
+        if not self.entries or entry[1] >= self.entries[0][1]:
+            # caso comum: jogo mais novo que todos — sai o mais antigo, entra o novo
+            if len(self.entries) >= self.capacity:
+                self._remove(self.entries.pop())
+            self.entries.appendleft(entry)
+            self._add(entry)
+            return True
+        if len(self.entries) >= self.capacity and entry[1] <= self.entries[-1][1]:
+            # mais antigo que toda a janela cheia: não entra
+            return False
+        # fora de ordem (raro): insere na posição e recalcula a partir do ring (O(capacity))
+        items = sorted(list(self.entries) + [entry], key=lambda e: e[1], reverse=True)[:self.capacity]
+        self.entries = deque(items)
+        self._rebuild()
+        return True
+
+    def trusted(self, now=None):
+        return self.synced_at is not None and (now or time.time()) - self.synced_at < TRUST_TTL
+
+    def ht_goal_pct(self, last):
+        k = max(0, min(int(last), self.size))
+        if not k:
+            return 0.0
+        if k == self.size:
+            return self.scored_count / k
+        return sum(1 for e in list(self.entries)[:k] if e[2]) / k
+
+    def avg_shots_ht(self, last):
+        k = max(0, min(int(last), self.size))
+        if k == self.size:
+            return (self.shots_sum / self.shots_count) if self.shots_count else 0.0
+        vals = [e[3] for e in list(self.entries)[:k] if e[3] is not None]
+        total = 0.0
+        for v in vals:
+            total += v
+        return (total / len(vals)) if vals else 0.0
+
+    def window(self, last):
+        return {"ht_goal_pct": self.ht_goal_pct(last), "avg_shots_ht": self.avg_shots_ht(last)}
+
+    def to_payload(self):
+        return {"synced_at": self.synced_at, "entries": [list(e) for e in self.entries], "v": teamstats.VERSION}
+
+    @classmethod
+    def from_payload(cls, team_id, payload, capacity=CAPACITY):
+        ring = cls(team_id, capacity, payload.get("synced_at"))
+        ring.entries = deque(tuple(e) for e in payload.get("entries", [])[:capacity])
+        ring._rebuild()
+        return ring
+
+class RollingStore:
+    def __init__(self, capacity=CAPACITY):
+        self.capacity = capacity
+        self._rings = {}
+        self._dirty = set()
+        self._lock = threading.Lock()
+        self.restored = 0
+        self.updates = 0
+
+    def get(self, team_id):
+        team_id = int(team_id)
+        with self._lock:
+            ring = self._rings.get(team_id)
+        if ring is not None:
+            return ring
+        payload = warehouse.load_rolling(team_id)
+        if payload is None or payload.get("v") != teamstats.VERSION:
+            # ring gravado com outra definição das métricas: é ressemeado a partir do histórico
+            return None
+        ring = TeamRing.from_payload(team_id, payload, self.capacity)
+        with self._lock:
+            self._rings.setdefault(team_id, ring)
+            self.restored += 1
+            return self._rings[team_id]
+
+    def usable(self, team_id, last):
+        # ring confiável e com jogos suficientes para a janela: dispensa o histórico do upstream
+        ring = self.get(team_id)
+        if ring is None or not ring.trusted() or last > self.capacity or ring.size < last:
+            return None
+        # jogo encerrado mais novo no warehouse que o ring não viu (ex.: de uma data que ninguém
+        # consultou, gravado pelo índice de liga ou por outro histórico): o ring está atrasado
+        latest = warehouse.team_history(team_id, 1)
+        if latest:
+            fid = warehouse.fixture_id_of(latest[0])
+            kickoff = int((latest[0].get("fixture") or {}).get("timestamp") or 0)
+            if kickoff >= ring.head()[1] and not ring.contains(fid):
+                return None
+        return ring
+
+    def seed(self, team_id, entries):
+        # (re)semeia a partir de um histórico completo (mais recente primeiro)
+        ring = TeamRing(team_id, self.capacity, time.time())
+        for e in reversed(entries[:self.capacity]):
+            ring.push(*e)
+        with self._lock:
+            self._rings[int(team_id)] = ring
+            self._dirty.add(int(team_id))
+        return ring
+
+    def observe(self, team_id, fixture_id, kickoff, scored, shots):
+        # jogo do time acabou de encerrar: atualização O(1) do ring existente
+        ring = self.get(team_id)
+        if ring is None:
+            return False
+        with self._lock:
+            changed = ring.push(fixture_id, kickoff, scored, shots)
+            if changed:
+                self._dirty.add(int(team_id))
+                self.updates += 1
+        return changed
+
+    def flush(self):
+        with self._lock:
+            dirty = [(tid, self._rings[tid].to_payload()) for tid in self._dirty if tid in self._rings]
+            self._dirty.clear()
+        if dirty:
+            warehouse.save_rolling(dirty)
+        return len(dirty)
+
+    def stats(self):
+        with self._lock:
+            return {"teams": len(self._rings), "capacity": self.capacity, "restored": self.restored,
+                    "updates": self.updates, "dirty": len(self._dirty)}
+
+store = RollingStore()
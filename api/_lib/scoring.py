@@ -0,0 +1,101 @@
+# api/_lib/scoring.py
+# Pontuação colunar do slate (ou de um backtest com milhares de jogos) com NumPy.
+# Reproduz exatamente compute_match_percentages_and_filter de api/filtro.py; NumPy é opcional —
+# sem ele, `available()` retorna False e o chamador usa a função por dict.
+
+from . import lazy
+
+# import adiado: o custo do numpy só aparece na primeira pontuação, não no cold start
+np = lazy.module("numpy", optional=True)
+
+REASON_PASS = "Atende critérios (pct/xG/finaliz)"
+REASON_FAIL = "Não atende critérios"
+METRICS = ("home_pct", "away_pct", "home_shots", "away_shots", "home_xg", "away_xg")
+
+def available():
+    return np is not None
+
+def _num(v):
+    # mesma coerção de float(x or 0) da versão por dict
+    return float(v or 0)
+
+def pack(matches):
+    # empacota as métricas de cada lado em arrays float64 (uma passada pelos dicts)
+    n = len(matches)
+    cols = {k: np.empty(n, dtype=np.float64) for k in METRICS}
+    for i, m in enumerate(matches):
+        home = m.get("home", {})
+        away = m.get("away", {})
+        cols["home_pct"][i] = _num(home.get("ht_goal_pct"))
+        cols["away_pct"][i] = _num(away.get("ht_goal_pct"))
+        cols["home_shots"][i] = _num(home.get("avg_shots_ht"))
+        cols["away_shots"][i] = _num(away.get("avg_shots_ht"))
+        cols["home_xg"][i] = _num(home.get("xG_ht"))
+        cols["away_xg"][i] = _num(away.get("xG_ht"))
+    return cols
+
+def _round2(x):
+    # np.round escala por 100 antes de arredondar, o que pode divergir do round() do Python
+    # (arredondamento correto do valor binário) só quando a parte fracionária fica a ~0.5;
+    # esses poucos casos são refeitos com o round() nativo para o resultado ser idêntico
+    out = np.round(x, 2)
+    scaled = x * 100.0
+    near_tie = np.abs(np.abs(scaled - np.trunc(scaled)) - 0.5) < 1e-6
+    for i in np.nonzero(near_tie)[0]:
+        out[i] = round(float(x[i]), 2)
+    return out
+
+def score_arrays(home_pct, away_pct, home_shots, away_shots, home_xg, away_xg):
+    max_pct = np.maximum(home_pct, away_pct)
+    total_shots = home_shots + away_shots
+    avg_xg = (home_xg + away_xg) / np.where((home_xg != 0) | (away_xg != 0), 2.0, 1.0)
+    score = _round2(max_pct * 100) + _round2(avg_xg * 10) + _round2(total_shots)
+    passed = (max_pct >= 0.25) | ((total_shots >= 2.5) & (avg_xg >= 0.2))
+    return {"max_pct": max_pct, "total_shots": total_shots, "avg_xg": avg_xg, "score": score, "pass": passed}
+
+def apply(matches):
+    # grava `_filter` em cada jogo, com o mesmo formato da versão por dict; devolve os scores
+    if not matches:
+        return np.empty(0, dtype=np.float64)
+    cols = pack(matches)
+    res = score_arrays(**cols)
+    lists = {k: v.tolist() for k, v in cols.items()}
+    max_pct = res["max_pct"].tolist()
+    total_shots = res["total_shots"].tolist()
+    avg_xg = res["avg_xg"].tolist()
+    score = res["score"].tolist()
+    passed = res["pass"].tolist()
+    for i, m in enumerate(matches):
+        m["_filter"] = {
+            "pass": bool(passed[i]),
+            "score": score[i],
+            "reason": REASON_PASS if passed[i] else REASON_FAIL,
+            "derived": {
+                "max_pct": max_pct[i],
+                "total_shots": total_shots[i],
+                "avg_xg": avg_xg[i],
+                "home_pct": lists["home_pct"][i],
+                "away_pct": lists["away_pct"][i],
+                "home_shots": lists["home_shots"][i],
+                "away_shots": lists["away_shots"][i],
+                "home_xg": lists["home_xg"][i],
+                "away_xg": lists["away_xg"][i],
+            },
+        }
+    return res["score"]
+
+def rank(scores, top=None):
+    # índices por score desc, empates na ordem original (igual a sorted(..., reverse=True));
+    # com `top`, argpartition seleciona os k melhores antes de ordenar só esses
+    scores = np.asarray(scores, dtype=np.float64)
+    n = len(scores)
+    idx = np.arange(n)
+    if top is not None and 0 < top < n:
+        # o k-ésimo maior score; empates na fronteira entram todos e são cortados após a ordenação
+        kth = scores[np.argpartition(-scores, top - 1)[:top]].min()
+        idx = idx[scores >= kth]
+    order = np.lexsort((idx, -scores[idx]))
+    ranked = idx[order]
+    if top is not None and top >= 0:
+        ranked = ranked[:top]
+    return ranked.tolist()
@@ -0,0 +1,133 @@
+# api/_lib/session.py
+# Sessão HTTP compartilhada com o upstream: pool de conexões keep-alive, gzip e retry com backoff
+# A sessão vive no escopo do módulo, então é reaproveitada entre invocações "quentes" da função.
+
+import os
+import random
+import threading
+import time
+from contextlib import ExitStack
+from email.utils import parsedate_to_datetime
+
+from . import lazy
+
+# requests só é importado na primeira chamada ao upstream (cold start mais curto)
+requests = lazy.module("requests")
+
+POOL_SIZE = max(1, int(os.environ.get("UPSTREAM_POOL_SIZE", 16)))
+MAX_RETRIES = max(0, int(os.environ.get("UPSTREAM_MAX_RETRIES", 3)))
+BACKOFF_BASE = float(os.environ.get("UPSTREAM_BACKOFF_BASE", 0.5))
+BACKOFF_MAX = float(os.environ.get("UPSTREAM_BACKOFF_MAX", 8.0))
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+class DeadlineExceeded(Exception):
+    # a chamada (ou a repetição dela) não cabe no orçamento de tempo da requisição
+    pass
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_session():
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                s = requests.Session()
+                # retry fica a nosso cargo (precisamos respeitar Retry-After e liberar o semáforo entre tentativas)
+                adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=POOL_SIZE, max_retries=0)
+                s.mount("https://", adapter)
+                s.mount("http://", adapter)
+                s.headers.update({"Accept-Encoding": "gzip, deflate", "Connection": "keep-alive"})
+                _session = s
+    return _session
+
+def parse_retry_after(value):
+    # Retry-After pode vir em segundos ou como data HTTP
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except Exception:
+        return None
+
+def backoff_delay(attempt, retry_after=None):
+    if retry_after is not None:
+        # espera pedida pelo servidor, sem teto: get() desiste quando ela passa de BACKOFF_MAX
+        return retry_after
+    # backoff exponencial com "full jitter"
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+def _gates(gate):
+    return () if gate is None else (tuple(gate) if isinstance(gate, (list, tuple)) else (gate,))
+
+def _enter(stack, gate, until):
+    # com `until`, a espera por vaga (semáforo) ou token (bucket) também para no deadline
+    if until is None:
+        stack.enter_context(gate)
+        return
+    if not gate.acquire(timeout=max(0.0, until - time.monotonic())):
+        raise DeadlineExceeded("sem vaga/token antes do deadline")
+    stack.push(gate)
+
+def get(url, params=None, headers=None, timeout=15, gate=None, on_response=None, route=None,
+        retry_status=RETRY_STATUS, until=None):
+    # `gate` é um context manager (ex.: semáforo) — ou uma sequência deles, adquiridos em ordem —
+    # mantido apenas durante cada tentativa, para que a espera do backoff não ocupe vaga de concorrência.
+    # `on_response` é chamado a cada resposta recebida, inclusive as que serão repetidas.
+    # `route(attempt)` -> (headers, gate, switched) refaz a escolha a cada tentativa (pool de chaves):
+    # quando a repetição sai por outra chave (switched), não há backoff a esperar.
+    # `until` (time.monotonic()) limita tudo: espera nos gates, timeout de cada tentativa e backoff;
+    # o que não couber vira DeadlineExceeded. Retry-After acima de BACKOFF_MAX na mesma chave encerra
+    # as tentativas com a última resposta (repetir antes da hora só renderia outro 429)
+    session = get_session()
+    gates = _gates(gate)
+    attempt = 0
+    delay = 0.0
+    last = None
+    while True:
+        switched = False
+        if route is not None:
+            headers, gate, switched = route(attempt)
+            gates = _gates(gate)
+        wait = delay if not switched else 0.0
+        if wait > BACKOFF_MAX:
+            return last
+        if last is not None:
+            last.close()
+            last = None
+        if until is not None and time.monotonic() + wait >= until:
+            raise DeadlineExceeded(f"tentativa {attempt + 1} não cabe no deadline")
+        if wait:
+            time.sleep(wait)
+        delay = 0.0
+        clamped = False
+        try:
+            with ExitStack() as stack:
+                for g in gates:
+                    _enter(stack, g, until)
+                attempt_timeout = timeout
+                if until is not None and until - time.monotonic() < timeout:
+                    attempt_timeout, clamped = until - time.monotonic(), True
+                    if attempt_timeout <= 0:
+                        raise DeadlineExceeded(f"tentativa {attempt + 1} não cabe no deadline")
+                r = session.get(url, params=params, headers=headers, timeout=attempt_timeout)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            if clamped and isinstance(e, requests.Timeout):
+                raise DeadlineExceeded("timeout encurtado pelo deadline") from e
+            if attempt >= MAX_RETRIES:
+                raise
+            delay = backoff_delay(attempt)
+            attempt += 1
+            continue
+        if on_response is not None:
+            on_response(r)
+        if r.status_code in retry_status and attempt < MAX_RETRIES:
+            delay = backoff_delay(attempt, parse_retry_after(r.headers.get("Retry-After")))
+            last = r
+            attempt += 1
+            continue
+        return r
@@ -0,0 +1,70 @@
+# api/_lib/singleflight.py
+# Coalescência de chamadas idênticas em voo: dentro da instância, requisições concorrentes para a
+# mesma chave esperam a primeira chamada e recebem o mesmo resultado (ou a mesma exceção).
+# Quem espera respeita o próprio deadline, e o DeadlineExceeded do líder (que é do orçamento dele,
+# não da chamada) não é repassado: o seguidor tenta de novo, como líder
+
+import threading
+import time
+
+from .session import DeadlineExceeded
+
+class _Call:
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+class Group:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.calls = 0
+        self.coalesced = 0
+        self.max_waiters = 0
+
+    def do(self, key, fn, until=None):
+        # `until` (time.monotonic()): limite de espera de quem chega como seguidor
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                leader = call is None
+                if leader:
+                    call = self._calls[key] = _Call()
+                    self.calls += 1
+                else:
+                    call.waiters += 1
+                    self.coalesced += 1
+                    self.max_waiters = max(self.max_waiters, call.waiters)
+            if leader:
+                break
+            if not call.done.wait(None if until is None else max(0.0, until - time.monotonic())):
+                raise DeadlineExceeded("chamada coalescida não terminou antes do deadline")
+            if isinstance(call.error, DeadlineExceeded):
+                continue
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            # remove antes de liberar: quem chegar depois faz uma chamada nova
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.result
+
+    def stats(self):
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._calls),
+                "max_waiters": self.max_waiters,
+            }
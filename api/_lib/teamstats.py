@@ -0,0 +1,101 @@
+# api/_lib/teamstats.py
+# Normalização das statistics de /fixtures/statistics (ou embutidas em /fixtures?ids=): cada payload
+# vira, numa única passada, {team_id: {chave canônica: float}} — "Total Shots" -> total_shots,
+# "expected_goals" -> expected_goals, "45%" -> 45.0, "1.23" -> 1.23. Jogo encerrado não muda, então
+# o índice dele fica em cache pelo id; o de jogo em andamento é refeito a cada payload novo.
+
+import os
+
+from .cache import TTLCache
+
+# muda quando a seleção/derivação das métricas muda: invalida features, rings e respostas já calculadas
+VERSION = 2
+
+CANONICAL = {
+    "shots on goal": "shots_on_goal",
+    "shots off goal": "shots_off_goal",
+    "total shots": "total_shots",
+    "blocked shots": "blocked_shots",
+    "shots insidebox": "shots_insidebox",
+    "shots outsidebox": "shots_outsidebox",
+    "fouls": "fouls",
+    "corner kicks": "corner_kicks",
+    "offsides": "offsides",
+    "ball possession": "ball_possession",
+    "yellow cards": "yellow_cards",
+    "red cards": "red_cards",
+    "goalkeeper saves": "goalkeeper_saves",
+    "total passes": "total_passes",
+    "passes accurate": "passes_accurate",
+    "passes %": "passes_pct",
+    "expected goals": "expected_goals",
+    "xg": "expected_goals",
+    "goals prevented": "goals_prevented",
+}
+
+INDEX_SIZE = int(os.environ.get("STATS_INDEX_SIZE", 20000))
+INDEX_TTL = float(os.environ.get("STATS_INDEX_TTL", 24 * 3600))
+_index_cache = TTLCache(INDEX_SIZE)
+
+def canonical(name):
+    # "Shots on Goal", "expected_goals", "Passes %" -> chave canônica; tipo desconhecido vira snake_case
+    norm = " ".join(str(name or "").replace("_", " ").replace("-", " ").lower().split())
+    return CANONICAL.get(norm) or norm.replace(" ", "_")
+
+def number(value):
+    # int/float como estão; "1.23" e "45%" viram float; None, "" e texto livre viram None
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        text = value.strip().rstrip("%").strip()
+        try:
+            return float(text) if text else None
+        except ValueError:
+            return None
+    return None
+
+def normalize(stats):
+    # lista do endpoint -> {team_id: {chave: valor}}; entradas sem time ou sem valor numérico são ignoradas
+    out = {}
+    if not isinstance(stats, list):
+        return out
+    for block in stats:
+        team = block.get("team") if isinstance(block, dict) else None
+        try:
+            tid = int(team.get("id")) if isinstance(team, dict) else None
+        except (TypeError, ValueError):
+            tid = None
+        if tid is None:
+            continue
+        values = out.setdefault(tid, {})
+        for st in block.get("statistics") or []:
+            key = canonical(st.get("type") or st.get("name"))
+            val = number(st.get("value"))
+            if key and val is not None and key not in values:
+                values[key] = val
+    return out
+
+def index(fixture_id, stats, final=True):
+    # `final`: statistics de jogo encerrado, seguras para reaproveitar pelo id
+    if final and fixture_id is not None:
+        cached = _index_cache.get(fixture_id)
+        if cached is not None:
+            return cached
+    idx = normalize(stats)
+    if final and fixture_id is not None and stats:
+        _index_cache.set(fixture_id, idx, INDEX_TTL)
+    return idx
+
+def total_shots(team_stats):
+    # "Total Shots"; sem ele, a soma das partes que vierem (no alvo, fora, bloqueadas)
+    if not team_stats:
+        return None
+    if "total_shots" in team_stats:
+        return team_stats["total_shots"]
+    parts = [team_stats[k] for k in ("shots_on_goal", "shots_off_goal", "blocked_shots") if k in team_stats]
+    return sum(parts) if parts else None
+
+def stats():
+    return _index_cache.stats()
@@ -0,0 +1,289 @@
+# api/_lib/warehouse.py
+# Armazém SQLite (stdlib) para jogos encerrados e suas statistics.
+# Jogo com status FT/AET/PEN nunca muda, então é gravado uma única vez e lido daqui em diante.
+# No runtime da Vercel só /tmp é gravável; o arquivo sobrevive enquanto a instância estiver quente.
+
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+ENABLED = os.environ.get("FILTRO_WAREHOUSE", "1").lower() not in ("0", "false", "no", "off")
+DB_PATH = os.environ.get("FILTRO_WAREHOUSE_PATH") or os.path.join(tempfile.gettempdir(), "filtro_ht.sqlite3")
+FINISHED_STATUSES = {"FT", "AET", "PEN"}
+# statistics vazias de jogo encerrado não são definitivas (a API costuma preenchê-las depois do apito):
+# valem por esse tempo e, vencidas, o jogo volta a ser buscado
+EMPTY_STATS_TTL = float(os.environ.get("WAREHOUSE_EMPTY_STATS_TTL", 6 * 3600))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS fixtures (
+    fixture_id INTEGER PRIMARY KEY,
+    kickoff INTEGER NOT NULL,
+    date TEXT,
+    league_id INTEGER,
+    season INTEGER,
+    home_id INTEGER,
+    away_id INTEGER,
+    status TEXT,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_fixtures_date ON fixtures(date);
+CREATE INDEX IF NOT EXISTS ix_fixtures_kickoff ON fixtures(kickoff);
+CREATE TABLE IF NOT EXISTS team_fixtures (
+    team_id INTEGER NOT NULL,
+    kickoff INTEGER NOT NULL,
+    fixture_id INTEGER NOT NULL,
+    PRIMARY KEY (team_id, fixture_id)
+);
+CREATE INDEX IF NOT EXISTS ix_team_fixtures_kickoff ON team_fixtures(team_id, kickoff DESC);
+CREATE TABLE IF NOT EXISTS statistics (
+    fixture_id INTEGER PRIMARY KEY,
+    payload TEXT NOT NULL,
+    stored_at INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS team_rolling (
+    team_id INTEGER PRIMARY KEY,
+    payload TEXT NOT NULL,
+    updated_at INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS team_sync (
+    team_id INTEGER PRIMARY KEY,
+    synced_at INTEGER NOT NULL
+);
+"""
+
+_local = threading.local()
+_init_lock = threading.Lock()
+_initialized = False
+_counters = {"fixture_hits": 0, "stats_hits": 0, "fixtures_stored": 0, "stats_stored": 0, "errors": 0}
+_counters_lock = threading.Lock()
+
+def _count(name, n=1):
+    with _counters_lock:
+        _counters[name] += n
+
+def _conn():
+    # uma conexão por thread; WAL permite leitores concorrentes com um escritor
+    global _initialized, ENABLED
+    if not ENABLED:
+        return None
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        return conn
+    try:
+        conn = sqlite3.connect(DB_PATH, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        if not _initialized:
+            with _init_lock:
+                if not _initialized:
+                    conn.executescript(SCHEMA)
+                    _initialized = True
+    except sqlite3.Error:
+        log.exception("Warehouse indisponível em %s — seguindo sem persistência", DB_PATH)
+        ENABLED = False
+        return None
+    _local.conn = conn
+    return conn
+
+def fixture_id_of(f):
+    try:
+        return int((f.get("fixture") or {}).get("id") or f.get("id"))
+    except (TypeError, ValueError):
+        return None
+
+def fixture_status(f):
+    return (((f.get("fixture") or {}).get("status") or {}).get("short") or "").upper()
+
+def is_finished(f):
+    return fixture_status(f) in FINISHED_STATUSES
+
+def _team_ids(f):
+    teams = f.get("teams") or {}
+    out = []
+    for side in ("home", "away"):
+        try:
+            out.append(int((teams.get(side) or {}).get("id")))
+        except (TypeError, ValueError):
+            out.append(None)
+    return out
+
+def store_fixtures(fixtures):
+    # grava apenas jogos encerrados; os demais são ignorados
+    conn = _conn()
+    if conn is None:
+        return 0
+    rows = []
+    links = []
+    for f in fixtures or []:
+        fid = fixture_id_of(f)
+        if not fid or not is_finished(f):
+            continue
+        fx = f.get("fixture") or {}
+        league = f.get("league") or {}
+        home_id, away_id = _team_ids(f)
+        kickoff = int(fx.get("timestamp") or 0)
+        # statistics embutidas (ex.: /fixtures?ids=) ficam na tabela própria
+        payload = {k: v for k, v in f.items() if k != "statistics"}
+        rows.append((fid, kickoff, (fx.get("date") or "")[:10], league.get("id"), league.get("season"),
+                     home_id, away_id, fixture_status(f), json.dumps(payload, separators=(",", ":"))))
+        for tid in (home_id, away_id):
+            if tid:
+                links.append((tid, kickoff, fid))
+    if not rows:
+        return 0
+    try:
+        with conn:
+            cur = conn.executemany("INSERT OR IGNORE INTO fixtures VALUES (?,?,?,?,?,?,?,?,?)", rows)
+            conn.executemany("INSERT OR IGNORE INTO team_fixtures VALUES (?,?,?)", links)
+        _count("fixtures_stored", max(cur.rowcount, 0))
+    except sqlite3.Error:
+        log.exception("Falha ao gravar fixtures no warehouse")
+        _count("errors")
+        return 0
+    return len(rows)
+
+def team_history(team_id, limit, before=None):
+    # jogos encerrados do time, mais recente primeiro; `before` (timestamp) limita ao passado
+    conn = _conn()
+    if conn is None:
+        return []
+    sql = ("SELECT f.payload FROM team_fixtures t JOIN fixtures f ON f.fixture_id = t.fixture_id "
+           "WHERE t.team_id = ?")
+    args = [int(team_id)]
+    if before is not None:
+        sql += " AND t.kickoff < ?"
+        args.append(int(before))
+    sql += " ORDER BY t.kickoff DESC LIMIT ?"
+    args.append(int(limit))
+    try:
+        rows = conn.execute(sql, args).fetchall()
+    except sqlite3.Error:
+        _count("errors")
+        return []
+    _count("fixture_hits", len(rows))
+    return [json.loads(r[0]) for r in rows]
+
+def fixtures_between(start_ts, end_ts):
+    # todos os jogos encerrados com start_ts <= kickoff < end_ts, em ordem cronológica (backtest)
+    conn = _conn()
+    if conn is None:
+        return []
+    try:
+        rows = conn.execute("SELECT payload FROM fixtures WHERE kickoff >= ? AND kickoff < ? ORDER BY kickoff, fixture_id",
+                            (int(start_ts), int(end_ts))).fetchall()
+    except sqlite3.Error:
+        _count("errors")
+        return []
+    _count("fixture_hits", len(rows))
+    return [json.loads(r[0]) for r in rows]
+
+def synced_at(team_id):
+    conn = _conn()
+    if conn is None:
+        return None
+    try:
+        row = conn.execute("SELECT synced_at FROM team_sync WHERE team_id = ?", (int(team_id),)).fetchone()
+    except sqlite3.Error:
+        _count("errors")
+        return None
+    return row[0] if row else None
+
+def mark_synced(team_id, ts=None):
+    conn = _conn()
+    if conn is None:
+        return
+    try:
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO team_sync VALUES (?, ?)", (int(team_id), int(ts or time.time())))
+    except sqlite3.Error:
+        _count("errors")
+
+# lista vazia gravada há mais de EMPTY_STATS_TTL conta como ausente
+_STATS_FRESH = "(payload != '[]' OR stored_at >= ?)"
+
+def get_statistics(fixture_id):
+    conn = _conn()
+    if conn is None:
+        return None
+    try:
+        row = conn.execute("SELECT payload FROM statistics WHERE fixture_id = ? AND " + _STATS_FRESH,
+                           (int(fixture_id), int(time.time() - EMPTY_STATS_TTL))).fetchone()
+    except sqlite3.Error:
+        _count("errors")
+        return None
+    if row is None:
+        return None
+    _count("stats_hits")
+    return json.loads(row[0])
+
+def get_statistics_many(fixture_ids):
+    # {fixture_id: statistics} apenas para os ids já armazenados
+    conn = _conn()
+    ids = [int(i) for i in fixture_ids]
+    if conn is None or not ids:
+        return {}
+    out = {}
+    cutoff = int(time.time() - EMPTY_STATS_TTL)
+    # respeita o limite de variáveis por statement do SQLite
+    try:
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            q = ("SELECT fixture_id, payload FROM statistics WHERE fixture_id IN (%s) AND " % ",".join("?" * len(chunk))
+                 + _STATS_FRESH)
+            for fid, payload in conn.execute(q, chunk + [cutoff]):
+                out[fid] = json.loads(payload)
+    except sqlite3.Error:
+        _count("errors")
+    _count("stats_hits", len(out))
+    return out
+
+def store_statistics(fixture_id, stats):
+    # só deve ser chamado para jogos encerrados (o payload não muda mais); lista vazia é provisória:
+    # expira em EMPTY_STATS_TTL e é substituída pelas statistics que chegarem depois
+    conn = _conn()
+    if conn is None or stats is None:
+        return
+    try:
+        with conn:
+            conn.execute("INSERT INTO statistics VALUES (?, ?, ?) ON CONFLICT(fixture_id) DO UPDATE SET "
+                         "payload = excluded.payload, stored_at = excluded.stored_at WHERE statistics.payload = '[]'",
+                         (int(fixture_id), json.dumps(stats, separators=(",", ":")), int(time.time())))
+        _count("stats_stored")
+    except sqlite3.Error:
+        _count("errors")
+
+def load_rolling(team_id):
+    conn = _conn()
+    if conn is None:
+        return None
+    try:
+        row = conn.execute("SELECT payload FROM team_rolling WHERE team_id = ?", (int(team_id),)).fetchone()
+    except sqlite3.Error:
+        _count("errors")
+        return None
+    return json.loads(row[0]) if row else None
+
+def save_rolling(items):
+    # items: [(team_id, payload)] gravados numa única transação
+    conn = _conn()
+    if conn is None or not items:
+        return
+    now = int(time.time())
+    rows = [(int(tid), json.dumps(payload, separators=(",", ":")), now) for tid, payload in items]
+    try:
+        with conn:
+            conn.executemany("INSERT OR REPLACE INTO team_rolling VALUES (?, ?, ?)", rows)
+    except sqlite3.Error:
+        _count("errors")
+
+def stats():
+    with _counters_lock:
+        out = dict(_counters)
+    out["enabled"] = ENABLED
+    return out
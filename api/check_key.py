@@ -1,28 +1,59 @@
 # api/check_key.py
 # Endpoint de diagnóstico — não revela a chave, apenas informa se ela existe e testa um call simples (sem expor a chave)
 import os
-import requests
-from flask import Flask, jsonify
+import sys
+import threading
+import time
+from flask import Flask, jsonify, request
+
+_API_DIR = os.path.dirname(os.path.abspath(__file__))
+if _API_DIR not in sys.path:
+    sys.path.insert(0, _API_DIR)
+from _lib import keypool
 
 app = Flask(__name__)
 
+# o call de teste ao upstream é reaproveitado por CHECK_KEY_PROBE_TTL segundos (?refresh=1 força)
+PROBE_TTL = float(os.environ.get("CHECK_KEY_PROBE_TTL", 300))
+_probe = {"at": None, "result": None}
+_probe_lock = threading.Lock()
+
+def _run_probe(host):
+    # requests só é importado quando o probe roda de fato (cold start mais curto)
+    import requests
+    result = {}
+    try:
+        # não enviamos a chave na resposta — apenas executamos a requisição e retornamos status/text (texto curto)
+        headers = {"x-apisports-key": "REDACTED_IF_PRESENT"}
+        r = requests.get(f"https://{host}/fixtures?date=2024-12-03", headers=headers, timeout=10)
+        result["external_status"] = r.status_code
+        # return only first 200 characters of body to avoid huge dumps and not leak key
+        result["external_body_snippet"] = (r.text or "")[:200]
+    except Exception as e:
+        result["external_error"] = str(e)
+    return result
+
 @app.route("/", methods=["GET"])
 def check_key():
-    api_key = os.environ.get("API_FOOTBALL_KEY")
-    present = bool(api_key)
+    pool = keypool.from_env()
+    present = bool(pool)
     host = os.environ.get("API_FOOTBALL_HOST", "v3.football.api-sports.io")
     # vamos tentar um GET simples apenas para ver qual é o comportamento (capturamos status/text)
     info = {"api_key_present": present, "api_host": host}
+    # pool de chaves: só quantidade, rótulo e prefixo do hash; o uso por chave de cada instância
+    # está em /api/metrics (filtro_api_key) e em _meta.keys de /api/filtro?meta=1
+    info["api_keys"] = {"count": len(pool), "keys": [{"key": k.label, "fingerprint": k.fingerprint} for k in pool.keys]}
     if not present:
-        info["note"] = "API_FOOTBALL_KEY not set in environment on this runtime."
+        info["note"] = "API_FOOTBALL_KEY / API_FOOTBALL_KEYS not set in environment on this runtime."
         return jsonify(info), 200
-    try:
-        # não enviamos a chave na resposta — apenas executamos a requisição e retornamos status/text (texto curto)
-        headers = {"x-apisports-key": "REDACTED_IF_PRESENT"}
-        r = requests.get(f"https://{host}/fixtures?date=2024-12-03", headers=headers, timeout=10)
-        info["external_status"] = r.status_code
-        # return only first 200 characters of body to avoid huge dumps and not leak key
-        info["external_body_snippet"] = (r.text or "")[:200]
-    except Exception as e:
-        info["external_error"] = str(e)
+    refresh = request.args.get("refresh", "").lower() in ("1", "true", "yes", "on")
+    with _probe_lock:
+        now = time.monotonic()
+        fresh = _probe["at"] is not None and now - _probe["at"] < PROBE_TTL
+        if refresh or not fresh:
+            _probe["result"] = _run_probe(host)
+            _probe["at"] = time.monotonic()
+        info.update(_probe["result"])
+        info["probe_cached"] = not refresh and fresh
+        info["probe_age_s"] = round(time.monotonic() - _probe["at"], 1)
     return jsonify(info), 200
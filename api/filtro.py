@@ -4,42 +4,341 @@
 # A chave da API deve estar em env var: API_FOOTBALL_KEY
 
 import os
+import sys
 import math
-from flask import Flask, request, jsonify
-import requests
+import time
+import threading
+import json
+import queue
+import base64
+import hashlib
+import datetime
+import heapq
+import contextvars
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask, Response, request, jsonify, g
+
+# permite importar os módulos de apoio em api/_lib tanto localmente quanto no runtime da Vercel
+_API_DIR = os.path.dirname(os.path.abspath(__file__))
+if _API_DIR not in sys.path:
+    sys.path.insert(0, _API_DIR)
+from _lib import lazy
+# requests fica para a primeira chamada ao upstream (cold start)
+requests = lazy.module("requests")
+from _lib import session as upstream
+from _lib import ratelimit
+from _lib import keypool
+from _lib import cache
+from _lib.cache import TTLCache, make_cache
+from _lib import warehouse
+from _lib.warehouse import fixture_id_of, fixture_status
+from _lib import planner
+from _lib.league_index import LeagueIndex
+from _lib import scoring
+from _lib.features import TeamFeatures, feature_key
+from _lib import rolling
+from _lib import teamstats
+from _lib import singleflight
+from _lib import metrics
+from _lib import pages
+from _lib import backtest
+from _lib import live
 
 app = Flask(__name__)
 
-API_KEY = os.environ.get("API_FOOTBALL_KEY")
+# uma ou mais chaves: API_FOOTBALL_KEYS="k1,k2,..." e/ou API_FOOTBALL_KEY (ver _lib/keypool.py)
+keys = keypool.from_env()
 API_HOST = os.environ.get("API_FOOTBALL_HOST", "v3.football.api-sports.io")
-BASE = f"https://{API_HOST}"
+# API_FOOTBALL_BASE (esquema + host) aponta para outro servidor, ex.: o stand-in do bench
+BASE = os.environ.get("API_FOOTBALL_BASE") or f"https://{API_HOST}"
+
+# concorrência: teto de workers por requisição e de chamadas simultâneas ao upstream
+# (a cota é protegida pelo semáforo, não pela execução sequencial)
+MAX_WORKERS = max(1, int(os.environ.get("FILTRO_MAX_WORKERS", 8)))
+UPSTREAM_CONCURRENCY = max(1, int(os.environ.get("FILTRO_UPSTREAM_CONCURRENCY", 4)))
+_upstream_sem = threading.BoundedSemaphore(UPSTREAM_CONCURRENCY)
+# históricos de jogos que começam além desse horizonte são prioridade baixa (recusáveis sem cota)
+LOW_PRIORITY_HOURS = float(os.environ.get("FILTRO_LOW_PRIORITY_HOURS", 24))
+
+# cache de histórico por time: guarda a maior janela já buscada e serve qualquer `last` menor
+TEAM_CACHE_SIZE = int(os.environ.get("TEAM_CACHE_SIZE", 2000))
+TEAM_CACHE_TTL = float(os.environ.get("TEAM_CACHE_TTL", 6 * 3600))
+TEAM_CACHE_TTL_LIVE = float(os.environ.get("TEAM_CACHE_TTL_LIVE", 60))
+LIVE_STATUSES = {"1H", "HT", "2H", "ET", "BT", "P", "LIVE", "INT", "SUSP"}
+# com FILTRO_CACHE_BACKEND=sqlite/redis os históricos, features e respostas ficam também num
+# cache compartilhado entre instâncias (ver _lib/cache.py); o índice de liga é só local
+team_history_cache = make_cache("team_history", TEAM_CACHE_SIZE)
+# histórico no warehouse é considerado completo por esse tempo após a última sincronização do time
+WAREHOUSE_SYNC_TTL = float(os.environ.get("WAREHOUSE_SYNC_TTL", 6 * 3600))
+# statistics dos jogos do histórico via /fixtures?ids= (até 20 ids por chamada)
+BATCH_STATS = os.environ.get("FILTRO_BATCH_STATS", "1").lower() not in ("0", "false", "no", "off")
+IDS_CHUNK = max(1, min(20, int(os.environ.get("FILTRO_IDS_CHUNK", 20))))
+# ingestão de liga/temporada inteira: 1 chamada por liga do slate em vez de 1 por time
+BULK_LEAGUES = os.environ.get("FILTRO_BULK_LEAGUES", "0").lower() not in ("0", "false", "no", "off")
+BULK_MAX_LEAGUES = max(1, int(os.environ.get("FILTRO_BULK_MAX_LEAGUES", 20)))
+LEAGUE_CACHE_TTL = float(os.environ.get("LEAGUE_CACHE_TTL", 6 * 3600))
+league_index_cache = TTLCache(int(os.environ.get("LEAGUE_CACHE_SIZE", 64)))
+# feature store por (time, histórico exato): janelas `last` múltiplas sem recomputar
+feature_cache = make_cache("features", int(os.environ.get("FEATURE_CACHE_SIZE", 4000)),
+                           encode=TeamFeatures.to_payload, decode=TeamFeatures.from_payload)
+# agregados móveis por time (ring buffers persistidos): slate sem chamadas de histórico
+ROLLING = os.environ.get("FILTRO_ROLLING", "1").lower() not in ("0", "false", "no", "off")
+# resposta compacta por padrão (sem o fixture bruto em "raw")
+COMPACT = os.environ.get("FILTRO_COMPACT", "0").lower() not in ("0", "false", "no", "off")
+# pontuação colunar (NumPy, opcional) do slate inteiro em vez de um dict por vez
+VECTOR_SCORING = os.environ.get("FILTRO_VECTOR_SCORING", "1").lower() not in ("0", "false", "no", "off")
+# backtest: intervalo máximo e quanto histórico antes do `from` entra nas janelas point-in-time
+BACKTEST_MAX_DAYS = int(os.environ.get("FILTRO_BACKTEST_MAX_DAYS", 800))
+BACKTEST_LOOKBACK_DAYS = int(os.environ.get("FILTRO_BACKTEST_LOOKBACK_DAYS", 400))
+# orçamento de tempo: para de agendar trabalho novo antes de a plataforma matar a função
+MAX_DURATION = float(os.environ.get("FILTRO_MAX_DURATION", 10))
+DEADLINE_MARGIN = float(os.environ.get("FILTRO_DEADLINE_MARGIN", 2))
+DEFAULT_TIME_BUDGET = max(0.0, MAX_DURATION - DEADLINE_MARGIN)
+# quanto uma chamada ao upstream já despachada (ou a do jogo garantido) pode passar do orçamento;
+# timeout, repetições, backoff e espera por token de cada chamada são cortados nesse limite
+UPSTREAM_GRACE = float(os.environ.get("FILTRO_UPSTREAM_GRACE", DEADLINE_MARGIN / 2))
+# modo ao vivo (/api/live): intervalo entre polls de /fixtures?live=all, duração de cada conexão SSE
+# (o EventSource reconecta sozinho) e se as statistics do próprio jogo entram (1 chamada a cada 20 alterados)
+LIVE_INTERVAL = float(os.environ.get("FILTRO_LIVE_INTERVAL", 15))
+LIVE_STREAM_SECONDS = float(os.environ.get("FILTRO_LIVE_STREAM_SECONDS", DEFAULT_TIME_BUDGET or 8))
+LIVE_PING = float(os.environ.get("FILTRO_LIVE_PING", 5))
+LIVE_RETRY_MS = int(os.environ.get("FILTRO_LIVE_RETRY_MS", 1000))
+LIVE_STATISTICS = os.environ.get("FILTRO_LIVE_STATISTICS", "0").lower() not in ("0", "false", "no", "off")
+LIVE_MAX_LAST = 20
+# singleflight: coalesce chamadas idênticas em voo dentro da instância
+SINGLEFLIGHT = os.environ.get("FILTRO_SINGLEFLIGHT", "1").lower() not in ("0", "false", "no", "off")
+inflight = singleflight.Group()
+# cache de respostas calculadas (corpo serializado + ETag) e Cache-Control para a edge da Vercel:
+# datas encerradas são imutáveis; datas em andamento valem por pouco tempo
+RESULT_CACHE = os.environ.get("FILTRO_RESULT_CACHE", "1").lower() not in ("0", "false", "no", "off")
+RESULT_TTL_FINAL = float(os.environ.get("FILTRO_RESULT_TTL_FINAL", 24 * 3600))
+RESULT_TTL_LIVE = float(os.environ.get("FILTRO_RESULT_TTL_LIVE", 60))
+EDGE_MAXAGE_FINAL = int(os.environ.get("FILTRO_EDGE_MAXAGE_FINAL", 3 * 24 * 3600))
+EDGE_MAXAGE_LIVE = int(os.environ.get("FILTRO_EDGE_MAXAGE_LIVE", 60))
+result_cache = make_cache("results", int(os.environ.get("FILTRO_RESULT_CACHE_SIZE", 256)))
+# intervalo from/to: teto de dias por requisição
+MAX_RANGE_DAYS = int(os.environ.get("FILTRO_MAX_RANGE_DAYS", 7))
 
-if not API_KEY:
+if not keys:
     # não interrompe o processo — apenas logará erro nas requisições
     app.logger.warning("API_FOOTBALL_KEY não definida nas variáveis de ambiente.")
+NO_KEY_ERROR = "API key não configurada. Defina API_FOOTBALL_KEY (ou API_FOOTBALL_KEYS) nas env vars."
+# com mais de uma chave, 403 também é repetido (por outra chave: a que respondeu fica em cooldown)
+POOL_RETRY_STATUS = upstream.RETRY_STATUS | {403}
+
+def _on_upstream_response(r):
+    # a cada tentativa (inclusive as repetidas): cota da chave pelos headers e métricas de latência/bytes/status
+    if keys.observe(r, upstream.parse_retry_after(r.headers.get("Retry-After"))) is None:
+        ratelimit.limiter.update_from_headers(r.headers, r.status_code)
+    metrics.record_upstream(urlparse(r.url).path, r.status_code, len(r.content), r.elapsed.total_seconds())
+
+def _route(chosen):
+    # a cada tentativa, a chave com mais saldo; a repetição após 429/403 sai por outra (sem backoff).
+    # Outra chave também em cooldown não conta como troca: vale a espera (Retry-After) da anterior
+    def route(attempt):
+        key = keys.choose()
+        switched = bool(chosen) and key is not chosen[-1] and not (key and key.cooling(time.monotonic()))
+        chosen.append(key)
+        if key is None:
+            return {}, (ratelimit.limiter, _upstream_sem), False
+        return key.headers(), (key.bucket, _upstream_sem), switched
+    return route
 
-def fetcher(path, params=None, timeout=15):
+def fetcher(path, params=None, timeout=15, priority=ratelimit.PRIORITY_NORMAL):
     params = params or {}
     url = BASE + path
-    headers = {"x-apisports-key": API_KEY} if API_KEY else {}
-    r = requests.get(url, params=params, headers=headers, timeout=timeout)
-    r.raise_for_status()
-    return r.json()
+    # prioridade baixa é recusada (BudgetExhausted) quando nenhuma chave tem saldo acima da reserva
+    keys.check_budget(priority)
+    # deadline da requisição corrente: a chamada inteira (com repetições) termina até o corte
+    deadline = _current_deadline.get()
+    until = deadline.cutoff() if deadline is not None else None
+
+    def call():
+        # sessão compartilhada (keep-alive) com retry/backoff para 429/5xx transitórios;
+        # cada tentativa consome um token do bucket da chave escolhida e ocupa uma vaga do semáforo
+        r = upstream.get(url, params=params, timeout=timeout, route=_route([]), on_response=_on_upstream_response,
+                         retry_status=POOL_RETRY_STATUS if len(keys) > 1 else upstream.RETRY_STATUS, until=until)
+        r.raise_for_status()
+        return r.json()
+
+    if not SINGLEFLIGHT:
+        return call()
+    # chamadas idênticas concorrentes (mesmo path/params) dividem uma única ida ao upstream;
+    # o JSON é compartilhado entre quem esperou, como já acontece com os caches
+    return inflight.do((path, tuple(sorted(params.items()))), call, until)
 
 def get_fixtures_by_date(date):
     r = fetcher("/fixtures", {"date": date})
     return r.get("response") or r.get("data") or []
 
-def get_last_fixtures_for_team(team_id, last=10):
-    r = fetcher("/fixtures", {"team": str(team_id), "last": str(last)})
+def _kickoff_ts(f):
+    ts = (f.get("fixture") or {}).get("timestamp")
+    try:
+        return float(ts or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+def _fetch_team_upstream(team_id, last, priority):
+    r = fetcher("/fixtures", {"team": str(team_id), "last": str(last)}, priority=priority)
     return r.get("response") or r.get("data") or []
 
-def get_statistics_for_fixture(fixture_id):
+def _team_history_read_through(team_id, last, priority, in_play):
+    # warehouse primeiro; do upstream só a cauda de jogos posteriores à última sincronização
+    stored = warehouse.team_history(team_id, last)
+    synced = warehouse.synced_at(team_id)
+    now = time.time()
+    if synced and not in_play and now - synced < WAREHOUSE_SYNC_TTL and len(stored) >= last:
+        return stored
+    tail = last
+    if synced and len(stored) >= last:
+        # ~1 jogo a cada 3 dias desde o sync, +1 para sobrepor ao mais recente que já temos
+        tail = min(last, int((now - synced) // (3 * 86400)) + 2)
+    fresh = _fetch_team_upstream(team_id, tail, priority)
+    known = {fixture_id_of(f) for f in stored}
+    if tail < last and fresh and not any(fixture_id_of(f) in known for f in fresh):
+        # a cauda não encostou no que já temos: pode haver lacuna, busca a janela inteira
+        fresh = _fetch_team_upstream(team_id, last, priority)
+    warehouse.store_fixtures(fresh)
+    warehouse.mark_synced(team_id, now)
+    merged = {fixture_id_of(f): f for f in stored}
+    merged.update((fixture_id_of(f), f) for f in fresh)
+    return sorted(merged.values(), key=_kickoff_ts, reverse=True)[:last]
+
+def get_last_fixtures_for_team(team_id, last=10, priority=ratelimit.PRIORITY_NORMAL, in_play=False):
+    last = int(last)
+    cached = team_history_cache.get(int(team_id))
+    if cached and cached["last"] >= last:
+        return cached["fixtures"][:last]
+    # mais recente primeiro, para que o recorte [:last] seja sempre a janela correta
+    fixtures = _team_history_read_through(team_id, last, priority, in_play)
+    # time com jogo em andamento terá histórico novo em breve: TTL curto
+    ttl = TEAM_CACHE_TTL_LIVE if in_play else TEAM_CACHE_TTL
+    team_history_cache.set(int(team_id), {"last": last, "fixtures": fixtures}, ttl)
+    return fixtures[:last]
+
+def get_statistics_for_fixture(fixture_id, finished=False):
+    # None quando a busca falhou (erro, cota ou deadline): diferente de "o jogo não tem statistics"
+    stored = warehouse.get_statistics(fixture_id)
+    if stored is not None:
+        return stored
     try:
         r = fetcher("/fixtures/statistics", {"fixture": str(fixture_id)})
-        return r.get("response") or r.get("data") or []
+        stats = r.get("response") or r.get("data") or []
     except Exception:
-        return []
+        app.logger.warning("Falha ao buscar statistics do jogo %s", fixture_id)
+        _degraded("statistics")
+        return None
+    if finished:
+        # jogo encerrado: statistics definitivas, persistem no warehouse
+        warehouse.store_statistics(fixture_id, stats)
+    return stats
+
+def get_league_index(league_id, season, in_play=False):
+    key = (int(league_id), int(season))
+    index = league_index_cache.get(key)
+    if index is not None:
+        return index
+    r = fetcher("/fixtures", {"league": str(league_id), "season": str(season)})
+    fixtures = r.get("response") or r.get("data") or []
+    # os encerrados também alimentam o warehouse (histórico e ids para statistics)
+    warehouse.store_fixtures(fixtures)
+    index = LeagueIndex(fixtures)
+    league_index_cache.set(key, index, TEAM_CACHE_TTL_LIVE if in_play else LEAGUE_CACHE_TTL)
+    return index
+
+def histories_from_leagues(plan, lastN, workers, deadline=None):
+    # ingere as ligas/temporadas do slate e serve o histórico dos times cobertos a partir do índice
+    leagues = plan.leagues()[:BULK_MAX_LEAGUES]
+    live = {t["league"] for t in plan.teams.values() if t["in_play"]}
+
+    def fetch(key):
+        try:
+            return get_league_index(key[0], key[1], key in live)
+        except (requests.RequestException, ratelimit.BudgetExhausted, upstream.DeadlineExceeded):
+            app.logger.warning("Falha ao ingerir liga %s/%s", key[0], key[1])
+            return None
+
+    indexes = {k: idx for k, idx in zip(leagues, run_ordered(fetch, leagues, workers, deadline))
+               if idx is not None and idx is not SKIPPED}
+    histories = {}
+    for tid, info in plan.teams.items():
+        index = indexes.get(info["league"])
+        if index is not None and index.covers(tid, lastN):
+            histories[tid] = index.history(tid, lastN)
+    plan.from_league_index = len(histories)
+    return histories
+
+def get_fixtures_by_ids(ids):
+    r = fetcher("/fixtures", {"ids": "-".join(str(i) for i in ids)})
+    return r.get("response") or r.get("data") or []
+
+def fetch_statistics_batch(fixture_ids, workers=1, deadline=None):
+    # deduplica os ids, lê o que já está no warehouse e busca o resto em lotes de IDS_CHUNK;
+    # /fixtures?ids= devolve as statistics embutidas em cada jogo
+    ids = sorted({int(i) for i in fixture_ids if i})
+    found = warehouse.get_statistics_many(ids)
+    missing = [i for i in ids if i not in found]
+    chunks = [missing[i:i + IDS_CHUNK] for i in range(0, len(missing), IDS_CHUNK)]
+
+    def fetch_chunk(chunk):
+        try:
+            return get_fixtures_by_ids(chunk)
+        except (requests.RequestException, ratelimit.BudgetExhausted, upstream.DeadlineExceeded):
+            app.logger.warning("Falha ao buscar statistics em lote (%d ids)", len(chunk))
+            _degraded("statistics")
+            return []
+
+    for fixtures in run_ordered(fetch_chunk, chunks, workers, deadline):
+        if fixtures is SKIPPED:
+            # lote não despachado (deadline): o proxy de finalizações sai sem esses jogos
+            _degraded("statistics")
+            continue
+        warehouse.store_fixtures(fixtures)
+        for f in fixtures:
+            fid = fixture_id_of(f)
+            stats = f.get("statistics")
+            if fid is None or stats is None:
+                continue
+            found[fid] = stats
+            if warehouse.is_finished(f):
+                warehouse.store_statistics(fid, stats)
+    return found
+
+def ht_scored(f, team_id):
+    # o time marcou no 1º tempo deste jogo?
+    score = f.get("score") or f.get("goals") or f
+    htHome = htAway = None
+    if score and isinstance(score, dict):
+        halftime = score.get("halftime") or score.get("ht")
+        if halftime:
+            htHome = halftime.get("home")
+            htAway = halftime.get("away")
+    is_home = False
+    teams = f.get("teams") or {}
+    if teams:
+        try:
+            is_home = int(teams.get("home", {}).get("id") or 0) == int(team_id)
+        except Exception:
+            is_home = False
+    ht_goals = (htHome if is_home else htAway) or 0
+    return ht_goals > 0
+
+def ht_shots_proxy(f, team_id, stats_by_fixture=None):
+    # finalizações do time no HT (proxy) ou None se o jogo não tem statistics
+    # se o endpoint já trouxe statistics embutido; senão, as buscadas em lote
+    fid = fixture_id_of(f)
+    stats_list = f.get("statistics") or (stats_by_fixture or {}).get(fid) or []
+    if not stats_list or not isinstance(stats_list, list):
+        return None
+    shots = teamstats.total_shots(teamstats.index(fid, stats_list, warehouse.is_finished(f)).get(_int_id(team_id)))
+    return shots / 2.0 if shots is not None else None  # proxy: metade das finalizações no 1º tempo
+
+def _int_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
 
 def compute_ht_goal_pct_from_last_fixtures(last_fixtures, team_id):
     if not isinstance(last_fixtures, list) or len(last_fixtures) == 0:
@@ -47,53 +346,34 @@ def compute_ht_goal_pct_from_last_fixtures(last_fixtures, team_id):
     count = 0
     total = 0
     for f in last_fixtures:
-        score = f.get("score") or f.get("goals") or f
-        htHome = htAway = None
-        if score and isinstance(score, dict):
-            halftime = score.get("halftime") or score.get("ht")
-            if halftime:
-                htHome = halftime.get("home")
-                htAway = halftime.get("away")
-        is_home = False
-        teams = f.get("teams") or {}
-        if teams:
-            try:
-                is_home = int(teams.get("home", {}).get("id") or 0) == int(team_id)
-            except Exception:
-                is_home = False
-        ht_goals = (htHome if is_home else htAway) or 0
-        if ht_goals > 0:
+        if ht_scored(f, team_id):
             count += 1
         total += 1
     return (count / total) if total else 0.0
 
-def estimate_avg_shots_ht_from_fixtures(last_fixtures, team_id):
+def estimate_avg_shots_ht_from_fixtures(last_fixtures, team_id, stats_by_fixture=None):
     if not isinstance(last_fixtures, list) or len(last_fixtures) == 0:
         return 0.0
     sum_shots = 0.0
     count = 0
     for f in last_fixtures:
-        # se o endpoint já trouxe statistics embutido
-        stats_list = f.get("statistics") or []
-        if stats_list and isinstance(stats_list, list):
-            team_stats = None
-            for s in stats_list:
-                tid = s.get("team", {}).get("id") if isinstance(s.get("team"), dict) else None
-                if tid and int(tid) == int(team_id):
-                    team_stats = s
-                    break
-            if team_stats:
-                stats = team_stats.get("statistics") or []
-                for st in stats:
-                    typ = (st.get("type") or st.get("name") or "").lower()
-                    if "shot" in typ:
-                        val = st.get("value")
-                        if isinstance(val, (int, float)):
-                            sum_shots += (val / 2.0)  # proxy: metade das finalizações no 1º tempo
-                            count += 1
-                            break
+        val = ht_shots_proxy(f, team_id, stats_by_fixture)
+        if val is not None:
+            sum_shots += val
+            count += 1
     return (sum_shots / count) if count else 0.0
 
+def get_team_features(team_id, history, stats_by_fixture=None):
+    # prefix sums do histórico inteiro; qualquer janela menor é O(1)
+    key = feature_key(team_id, history, stats_by_fixture)
+    feats = feature_cache.get(key)
+    if feats is not None and feats.size >= len(history):
+        return feats
+    feats = TeamFeatures([ht_scored(f, team_id) for f in history],
+                         [ht_shots_proxy(f, team_id, stats_by_fixture) for f in history])
+    feature_cache.set(key, feats, TEAM_CACHE_TTL)
+    return feats
+
 def compute_match_percentages_and_filter(match):
     home = match.get("home", {})
     away = match.get("away", {})
@@ -129,92 +409,826 @@ def compute_match_percentages_and_filter(match):
     }
     return match
 
+def fixture_priority(f):
+    ts = (f.get("fixture") or {}).get("timestamp")
+    try:
+        if ts and float(ts) - time.time() > LOW_PRIORITY_HOURS * 3600:
+            return ratelimit.PRIORITY_LOW
+    except (TypeError, ValueError):
+        pass
+    return ratelimit.PRIORITY_NORMAL
+
+def _fixture_teams(f):
+    homeTeam = f.get("teams", {}).get("home") or f.get("home") or {}
+    awayTeam = f.get("teams", {}).get("away") or f.get("away") or {}
+    return homeTeam, awayTeam
+
+def build_slate_plan(fixtures):
+    return planner.build_plan(fixtures, _fixture_teams, fixture_priority, LIVE_STATUSES, ratelimit.PRIORITY_LOW)
+
+def prefetch_team_histories(plan, lastN, workers, deadline=None, known=None, skip=()):
+    # busca uma única vez cada time do plano (deduplicado entre os jogos do slate);
+    # `known` traz históricos já resolvidos localmente (ex.: índice de liga) e `skip`
+    # os times que não precisam de histórico (ex.: ring buffer confiável)
+    known = known or {}
+    def fetch(item):
+        team_id, info = item
+        try:
+            return get_last_fixtures_for_team(team_id, lastN, info["priority"], info["in_play"])
+        except (ratelimit.BudgetExhausted, upstream.DeadlineExceeded):
+            _degraded("history")
+            return REFUSED
+
+    items = [(tid, info) for tid, info in plan.teams.items() if tid not in known and tid not in skip]
+    # com backend compartilhado, os históricos do slate vêm numa única ida (MGET) antes do fan-out
+    team_history_cache.prefetch([int(tid) for tid, _ in items])
+    results = run_ordered(fetch, items, workers, deadline)
+    out = dict(known)
+    # recusado (cota/deadline) fica de fora, como o não despachado: process_fixture tenta de novo
+    # e, recusado outra vez, marca o jogo com _skipped em vez de tratar [] como histórico real
+    out.update((tid, hist) for (tid, _), hist in zip(items, results) if hist is not SKIPPED and hist is not REFUSED)
+    return out
+
+def window_metrics(windows, home_feats, away_feats, home_xg_ht, away_xg_ht):
+    # métricas e resultado do filtro para cada janela pedida, sem nova busca nem recomputação
+    out = {}
+    for w in windows:
+        sides = {}
+        for side, feats, xg in (("home", home_feats, home_xg_ht), ("away", away_feats, away_xg_ht)):
+            sides[side] = {
+                "ht_goal_pct": round(feats.ht_goal_pct(w), 4) if feats else 0.0,
+                "avg_shots_ht": round(feats.avg_shots_ht(w), 2) if feats else 0.0,
+                "xG_ht": round(xg, 4),
+            }
+        flt = compute_match_percentages_and_filter(dict(sides))["_filter"]
+        out[str(w)] = {"home": sides["home"], "away": sides["away"], "pass": flt["pass"], "score": flt["score"]}
+    return out
+
+def parse_windows(value, default=10):
+    # `last` aceita um inteiro ou vários: "3,5,8,10" (GET) ou [3, 5, 8, 10] (POST)
+    if value in (None, ""):
+        return [default]
+    items = value if isinstance(value, (list, tuple)) else str(value).split(",")
+    windows = []
+    for item in items:
+        w = int(str(item).strip())
+        if w < 1:
+            raise ValueError("`last` deve ser >= 1")
+        if w not in windows:
+            windows.append(w)
+    return windows or [default]
+
+def score_and_rank(matches, top=None, keep=None):
+    # pontua e ordena por score desc (empates na ordem de entrada); `keep` descarta jogos já
+    # pontuados antes do ranking e `top` só ordena os k melhores (heap/argpartition)
+    if VECTOR_SCORING and scoring.available():
+        scores = scoring.apply(matches)
+        idx = [i for i, m in enumerate(matches) if keep is None or keep(m)]
+        order = scoring.rank([scores[i] for i in idx], top)
+        return [matches[idx[j]] for j in order]
+    matches = [compute_match_percentages_and_filter(m) for m in matches]
+    candidates = [(i, m) for i, m in enumerate(matches) if keep is None or keep(m)]
+    key = lambda im: (-im[1].get("_filter", {}).get("score", 0), im[0])
+    if top is not None:
+        return [m for _, m in heapq.nsmallest(max(top, 0), candidates, key=key)]
+    return [m for _, m in sorted(candidates, key=key)]
+
+def _param_list(value):
+    # "a,b" na query string ou lista no JSON; None = sem restrição
+    if value in (None, ""):
+        return None
+    items = value if isinstance(value, (list, tuple)) else str(value).split(",")
+    return {str(x).strip().lower() for x in items if str(x).strip()} or None
+
+def parse_view(params):
+    # filtros e formato da resposta; ValueError vira 400
+    view = {
+        "leagues": _param_list(params.get("league") or params.get("leagues")),
+        "countries": _param_list(params.get("country") or params.get("countries")),
+        "only_pass": _flag(params.get("only_pass")),
+        "min_score": None,
+        "top": None,
+        "fields": _param_list(params.get("fields")),
+        "compact": _flag(params.get("compact", COMPACT)),
+    }
+    try:
+        if params.get("min_score") not in (None, ""):
+            view["min_score"] = float(params.get("min_score"))
+        if params.get("top") not in (None, ""):
+            view["top"] = int(params.get("top"))
+    except (TypeError, ValueError):
+        raise ValueError("Parâmetros `min_score`/`top` inválidos")
+    if view["top"] is not None and view["top"] < 0:
+        raise ValueError("`top` deve ser >= 0")
+    return view
+
+def select_fixtures(fixtures, view):
+    # allow-lists de liga (id ou nome) e país aplicadas antes do fan-out: jogo descartado
+    # aqui não gera nenhuma chamada de histórico/statistics
+    leagues, countries = view["leagues"], view["countries"]
+    if not leagues and not countries:
+        return fixtures
+    out = []
+    for f in fixtures:
+        league = f.get("league") or {}
+        if leagues and str(league.get("id")) not in leagues and (league.get("name") or "").lower() not in leagues:
+            continue
+        if countries and (league.get("country") or "").lower() not in countries:
+            continue
+        out.append(f)
+    return out
+
+def result_filter(view):
+    # predicado pós-pontuação (only_pass/min_score) ou None
+    if not view["only_pass"] and view["min_score"] is None:
+        return None
+
+    def keep(m):
+        flt = m.get("_filter", {})
+        if view["only_pass"] and not flt.get("pass"):
+            return False
+        return view["min_score"] is None or flt.get("score", 0) >= view["min_score"]
+    return keep
+
+def project(m, view):
+    # fields= escolhe as chaves de topo (id sempre vai); compact tira o fixture bruto
+    if view["fields"]:
+        return {k: v for k, v in m.items() if k == "id" or k.lower() in view["fields"]}
+    if view["compact"]:
+        return {k: v for k, v in m.items() if k != "raw"}
+    return m
+
+def present(matches, view):
+    return [project(m, view) for m in matches]
+
+def rolling_features(plan, lastN):
+    # times cujo ring buffer cobre a janela: métricas sem nenhuma chamada de histórico
+    out = {}
+    for tid in plan.teams:
+        ring = rolling.store.usable(tid, lastN)
+        if ring is not None:
+            out[tid] = ring
+    plan.from_rolling = len(out)
+    return out
+
+def _ring_entry(f, team_id, stats_by_fixture):
+    return (fixture_id_of(f), _kickoff_ts(f), ht_scored(f, team_id), ht_shots_proxy(f, team_id, stats_by_fixture))
+
+def update_rolling(histories, slate, stats_by_fixture, league_teams=(), requested=()):
+    # semeia rings a partir dos históricos completos recém-obtidos (o índice de liga não conta:
+    # só tem jogos daquela competição) e empurra os jogos do slate que já encerraram.
+    # Requisição degradada não toca os rings: um ring semeado com shots=None por falha de statistics
+    # serviria métricas zeradas (e cacheáveis) até perder a confiança
+    if degraded_reasons():
+        return
+    # statistics pedidas que não voltaram: o jogo (ou o ring inteiro, na semeadura) fica de fora
+    missing = lambda f: fixture_id_of(f) in requested and fixture_id_of(f) not in stats_by_fixture and not f.get("statistics")
+    for tid, hist in histories.items():
+        if tid in league_teams or not hist or any(missing(f) for f in hist):
+            continue
+        ring = rolling.store.get(tid)
+        if (ring is None or not ring.trusted() or ring.size < min(len(hist), rolling.store.capacity)
+                or ring.head()[0] != fixture_id_of(hist[0])):
+            rolling.store.seed(tid, [_ring_entry(f, tid, stats_by_fixture) for f in hist])
+    for f in slate:
+        if not warehouse.is_finished(f) or missing(f):
+            continue
+        for team in _fixture_teams(f):
+            if team.get("id"):
+                rolling.store.observe(team["id"], *_ring_entry(f, team["id"], stats_by_fixture))
+    rolling.store.flush()
+
+def _features_for(team_id, history, stats_by_fixture, team_features):
+    if not team_id:
+        return None
+    if team_id in team_features:
+        return team_features[team_id]
+    return get_team_features(team_id, history, stats_by_fixture)
+
+def _team_last(team_id, lastN, priority, in_play, histories):
+    if not team_id:
+        return []
+    if team_id in histories:
+        return histories[team_id][:lastN]
+    return get_last_fixtures_for_team(team_id, lastN, priority, in_play)
+
+def fixture_xg(stats, home_id, away_id, fixture_id=None, final=False):
+    # xG do próprio jogo (expected_goals das statistics dele); sem xG, total de finalizações / 2
+    idx = teamstats.index(fixture_id, stats, final) if stats else {}
+    out = []
+    for tid in (home_id, away_id):
+        team = idx.get(_int_id(tid))
+        xg = (team or {}).get("expected_goals")
+        if xg is None:
+            shots = teamstats.total_shots(team)
+            xg = shots / 2.0 if shots is not None else 0.0
+        out.append(float(xg))
+    return out[0], out[1]
+
+def process_fixture(f, date, lastN, plan, stats_by_fixture=None, batch_stats=False, histories=None, score=True,
+                    windows=None, team_features=None):
+    # calcula as métricas de um jogo (2 históricos + statistics), seguindo o plano do slate.
+    # `lastN` é o tamanho buscado do histórico; `windows` as janelas pedidas (a 1ª é a principal)
+    windows = windows or [lastN]
+    team_features = team_features or {}
+    fixture_id = f.get("fixture", {}).get("id") or f.get("id")
+    homeTeam, awayTeam = _fixture_teams(f)
+
+    skipped = []
+    priority = fixture_priority(f)
+    in_play = fixture_status(f) in LIVE_STATUSES
+    if not plan.needs_history(fixture_id):
+        # adiado/cancelado: nada a calcular
+        home_last = away_last = []
+        skipped.append("history")
+    else:
+        histories = histories or {}
+        try:
+            # time com ring buffer confiável não precisa de histórico
+            home_last = [] if homeTeam.get("id") in team_features else _team_last(homeTeam.get("id"), lastN, priority, in_play, histories)
+            away_last = [] if awayTeam.get("id") in team_features else _team_last(awayTeam.get("id"), lastN, priority, in_play, histories)
+        except (ratelimit.BudgetExhausted, upstream.DeadlineExceeded):
+            # cota diária na reserva (jogo distante fica sem histórico em vez de queimar a cota)
+            # ou chamada cortada pelo deadline
+            home_last = away_last = []
+            skipped.append("history")
+            _degraded("history")
+
+    if batch_stats and stats_by_fixture is None:
+        # modo por jogo (stream): statistics dos dois históricos (e do próprio jogo) num único lote
+        ids = [fixture_id_of(h) for h in home_last + away_last if not h.get("statistics")]
+        if fixture_id and plan.needs_statistics(fixture_id):
+            ids.append(fixture_id)
+        stats_by_fixture = fetch_statistics_batch(ids)
+
+    # mesmos valores de compute_ht_goal_pct_from_last_fixtures / estimate_avg_shots_ht_from_fixtures,
+    # via prefix sums reaproveitáveis para todas as janelas
+    home_feats = _features_for(homeTeam.get("id"), home_last, stats_by_fixture, team_features)
+    away_feats = _features_for(awayTeam.get("id"), away_last, stats_by_fixture, team_features)
+    home_ht_pct = home_feats.ht_goal_pct(windows[0]) if home_feats else 0.0
+    away_ht_pct = away_feats.ht_goal_pct(windows[0]) if away_feats else 0.0
+
+    home_avg_shots_ht = home_feats.avg_shots_ht(windows[0]) if home_feats else 0.0
+    away_avg_shots_ht = away_feats.avg_shots_ht(windows[0]) if away_feats else 0.0
+
+    stats = []
+    if fixture_id and plan.needs_statistics(fixture_id):
+        if stats_by_fixture and fixture_id in stats_by_fixture:
+            stats = stats_by_fixture[fixture_id]
+        else:
+            stats = get_statistics_for_fixture(fixture_id, warehouse.is_finished(f))
+        if stats is None:
+            stats = []
+            skipped.append("statistics")
+        elif warehouse.is_finished(f):
+            planner.note_statistics(f, stats)
+    home_xg_ht, away_xg_ht = fixture_xg(stats, homeTeam.get("id"), awayTeam.get("id"), fixture_id,
+                                        warehouse.is_finished(f))
+
+    match_obj = {
+        "id": fixture_id or f.get("id") or f"{homeTeam.get('id')}-{awayTeam.get('id')}-{date}",
+        "date": date,
+        "league": f.get("league"),
+        "home": {
+            "id": homeTeam.get("id"),
+            "name": homeTeam.get("name"),
+            "ht_goal_pct": round(home_ht_pct, 4),
+            "avg_shots_ht": round(home_avg_shots_ht, 2),
+            "xG_ht": round(home_xg_ht, 4),
+        },
+        "away": {
+            "id": awayTeam.get("id"),
+            "name": awayTeam.get("name"),
+            "ht_goal_pct": round(away_ht_pct, 4),
+            "avg_shots_ht": round(away_avg_shots_ht, 2),
+            "xG_ht": round(away_xg_ht, 4),
+        },
+        "raw": f,
+    }
+    if skipped:
+        match_obj["_skipped"] = skipped
+    if len(windows) > 1:
+        match_obj["windows"] = window_metrics(windows, home_feats, away_feats, home_xg_ht, away_xg_ht)
+
+    # score=False: a pontuação fica para score_and_rank (passada única sobre o slate)
+    return compute_match_percentages_and_filter(match_obj) if score else match_obj
+
+def _flag(value):
+    return str(value).lower() in ("1", "true", "yes", "on")
+
+def build_response(out, meta, with_meta):
+    # padrão continua sendo a lista pura; ?meta=1 devolve {"matches": [...], "_meta": {...}}
+    if with_meta:
+        with metrics.phase("serialize"):
+            return jsonify({"matches": out, "_meta": meta})
+    with metrics.phase("serialize"):
+        resp = jsonify(out)
+    # na lista pura, o resultado parcial é sinalizado por headers
+    if meta.get("partial"):
+        resp.headers["X-Filtro-Partial"] = "1"
+        resp.headers["X-Filtro-Continuation"] = meta["continuation"]
+    return resp
+
+def build_meta(date, windows, count, plan=None):
+    meta = {
+        "date": date,
+        "last": windows[0],
+        "count": count,
+        "rate_limit": ratelimit.limiter.snapshot(),
+        "keys": keys.snapshot(),
+        "team_cache": team_history_cache.stats(),
+        "warehouse": warehouse.stats(),
+        "rolling": rolling.store.stats(),
+        "singleflight": inflight.stats(),
+    }
+    if len(windows) > 1:
+        meta["windows"] = windows
+    if plan is not None:
+        meta["plan"] = plan.summary()
+    degraded = degraded_reasons()
+    if degraded:
+        meta["degraded"] = degraded
+    timings = metrics.current()
+    if timings is not None:
+        # fases até aqui (a serialização só aparece no Server-Timing)
+        meta["timings"] = timings.as_dict()
+    return meta
+
+NDJSON_MIMETYPE = "application/x-ndjson"
+# campos do _meta que descrevem o resultado, não a execução: só eles vão para o resumo cacheado
+# (cota, chaves, caches, plano e timings são desta instância e deste momento)
+RESULT_META = ("date", "last", "windows", "count", "total", "offset", "processed", "partial")
+
+def _ndjson(obj):
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+def stream_response(fixtures, date, windows, workers, batch_stats, offset=0, deadline=None, bulk=False,
+                    use_rolling=False, view=None, rkey=None, final=False):
+    # ?stream=1: uma linha NDJSON por jogo assim que fica pronto (ordem de conclusão) e,
+    # no fim, uma linha de resumo com o ranking ordenado. Só (score, índice, id) fica em memória,
+    # além das linhas já enviadas quando há `rkey`: stream completo e sem degradação vai para o
+    # cache de respostas, e a próxima carga igual sai do cache (e da edge) sem recalcular
+    total = len(fixtures)
+    pending = fixtures[offset:]
+    plan = build_slate_plan(pending)
+    lastN = max(windows)
+    view = view or parse_view({})
+    keep = result_filter(view)
+
+    def generate():
+        ranking = []
+        processed = 0
+        sent = [] if rkey is not None and RESULT_CACHE else None
+        # o corpo é gerado fora da view: o deadline precisa valer também aqui
+        _current_deadline.set(deadline)
+        try:
+            # índices de liga são poucas chamadas e liberam os históricos sem custo por jogo
+            histories = histories_from_leagues(plan, lastN, workers, deadline) if bulk else {}
+            team_features = rolling_features(plan, lastN) if use_rolling else {}
+
+            def fn(f):
+                # sem pré-busca do slate: as statistics do histórico saem em lote por jogo
+                return process_fixture(f, date, lastN, plan, None, batch_stats, histories, windows=windows,
+                                       team_features=team_features)
+
+            for index, m in iter_completed(fn, pending, workers, deadline, progress=True):
+                processed += 1
+                if keep is not None and not keep(m):
+                    continue
+                ranking.append((-m.get("_filter", {}).get("score", 0), index, m.get("id")))
+                line = _ndjson({"type": "match", "index": offset + index, "total": total, "match": project(m, view)})
+                if sent is not None:
+                    sent.append(line)
+                yield line
+            # mesmo critério do modo normal: score desc, empates na ordem de `fixtures`
+            ranking = sorted(ranking) if view["top"] is None else heapq.nsmallest(view["top"], ranking)
+            meta = build_meta(date, windows, len(ranking), plan)
+            meta.update(progress_info(date, windows, fixtures, offset, processed))
+            summary = {
+                "type": "summary",
+                "count": len(ranking),
+                "ranking": [mid for _, _, mid in ranking],
+                "partial": meta["partial"],
+                "continuation": meta.get("continuation"),
+            }
+            if sent is not None and not meta["partial"] and not meta.get("degraded"):
+                # a réplica (cache e edge) leva só o _meta estável
+                sent.append(_ndjson(dict(summary, _meta={k: meta[k] for k in RESULT_META if k in meta})))
+                result_cache.set(rkey, ("".join(sent), final, NDJSON_MIMETYPE),
+                                 RESULT_TTL_FINAL if final else RESULT_TTL_LIVE)
+            yield _ndjson(dict(summary, _meta=meta))
+        except requests.HTTPError as he:
+            app.logger.exception("Erro HTTP ao chamar API externa (stream)")
+            yield _ndjson({"type": "error", "error": "Erro ao acessar API externa", "detail": str(he)})
+        except Exception as e:
+            app.logger.exception("Erro interno /api/filtro (stream)")
+            yield _ndjson({"type": "error", "error": "Erro interno", "detail": str(e)})
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return Response(generate(), mimetype=NDJSON_MIMETYPE, headers=headers)
+
+def _resolve_workers(value):
+    try:
+        n = int(value) if value not in (None, "") else MAX_WORKERS
+    except (TypeError, ValueError):
+        n = MAX_WORKERS
+    return max(1, min(n, MAX_WORKERS))
+
+# marcador de item não despachado porque o orçamento de tempo acabou
+SKIPPED = object()
+# histórico recusado pela cota (BudgetExhausted) ou cortado pelo deadline
+REFUSED = object()
+
+class Deadline:
+    # orçamento de tempo da requisição (relógio monotônico); budget None/0 = sem limite
+    def __init__(self, budget=None):
+        self.started = time.monotonic()
+        self.budget = budget
+        self.expires = (self.started + budget) if budget else None
+        # motivo -> ocorrências de chamadas recusadas/falhas que deixaram o resultado incompleto
+        self.degraded = {}
+        self._lock = threading.Lock()
+
+    def degrade(self, reason):
+        with self._lock:
+            self.degraded[reason] = self.degraded.get(reason, 0) + 1
+
+    def reasons(self):
+        with self._lock:
+            return dict(self.degraded)
+
+    def expired(self):
+        return self.expires is not None and time.monotonic() >= self.expires
+
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    def remaining(self):
+        return None if self.expires is None else self.expires - time.monotonic()
+
+    def cutoff(self):
+        # limite (monotônico) das chamadas ao upstream: o orçamento mais a folga UPSTREAM_GRACE
+        return None if self.expires is None else self.expires + UPSTREAM_GRACE
+
+# deadline da requisição corrente, lido pelo fetcher (os workers herdam via copy_context)
+_current_deadline = contextvars.ContextVar("filtro_deadline", default=None)
+
+def _degraded(reason):
+    # histórico/statistics recusados pela cota, cortados pelo deadline ou com erro: o resultado
+    # da requisição fica incompleto e não vai para o cache nem para a edge
+    deadline = _current_deadline.get()
+    if deadline is not None:
+        deadline.degrade(reason)
+
+def degraded_reasons():
+    deadline = _current_deadline.get()
+    return deadline.reasons() if deadline is not None else {}
+
+def run_ordered(fn, items, workers, deadline=None, progress=False):
+    # resultados na ordem de `items`; o que não foi despachado antes do deadline vira SKIPPED
+    items = list(items)
+    results = [SKIPPED] * len(items)
+    for i, res in iter_completed(fn, items, workers, deadline, progress):
+        results[i] = res
+    return results
+
+def iter_completed(fn, items, workers, deadline=None, progress=False):
+    # entrega (índice, resultado) na ordem de conclusão; workers=1 mantém o modo sequencial.
+    # O despacho é feito em ordem de índice sob lock, junto com a checagem do deadline, então
+    # os itens processados formam sempre um prefixo de `items` (base do token de continuação).
+    # Com `progress` (só a fase dos jogos), o primeiro item roda mesmo com o orçamento vencido,
+    # garantindo progresso entre continuações; nas demais fases, deadline vencido = nada despachado.
+    items = list(items)
+    first = 1 if progress else 0
+    if workers <= 1 or len(items) <= 1:
+        for i, it in enumerate(items):
+            if i >= first and deadline is not None and deadline.expired():
+                return
+            yield i, fn(it)
+        return
+    lock = threading.Lock()
+    state = {"next": 0, "stop": False}
+    done = queue.Queue()
+
+    def worker():
+        try:
+            while True:
+                with lock:
+                    i = state["next"]
+                    if state["stop"] or i >= len(items) or (i >= first and deadline is not None and deadline.expired()):
+                        return
+                    state["next"] = i + 1
+                try:
+                    done.put((i, fn(items[i]), None))
+                except Exception as e:
+                    state["stop"] = True
+                    done.put((i, None, e))
+        finally:
+            done.put(None)
+
+    n = min(workers, len(items))
+    ex = ThreadPoolExecutor(max_workers=n)
+    for _ in range(n):
+        # cada worker herda uma cópia do contexto: as métricas caem na requisição corrente
+        ex.submit(contextvars.copy_context().run, worker)
+    finished = 0
+    try:
+        while finished < n:
+            item = done.get()
+            if item is None:
+                finished += 1
+                continue
+            i, res, err = item
+            if err is not None:
+                raise err
+            yield i, res
+    finally:
+        # em caso de erro (ou cliente desconectado) não despacha o restante da fila
+        state["stop"] = True
+        ex.shutdown(wait=True)
+
+def _slate_hash(fixtures):
+    ids = ",".join(str(fixture_id_of(f)) for f in fixtures)
+    return hashlib.sha1(ids.encode()).hexdigest()[:12]
+
+def encode_continuation(date, windows, offset, slate_hash):
+    last = windows[0] if len(windows) == 1 else windows
+    raw = json.dumps({"v": 1, "d": date, "l": last, "o": offset, "h": slate_hash}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_continuation(token):
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        data = json.loads(raw)
+        if data.get("v") != 1:
+            raise ValueError("versão")
+        last = data["l"]
+        windows = [int(w) for w in last] if isinstance(last, list) else [int(last)]
+        return {"date": data["d"], "windows": windows, "offset": int(data["o"]), "hash": data["h"]}
+    except Exception:
+        raise ValueError("Token de continuação inválido")
+
+def _resolve_budget(value):
+    # padrão: margem abaixo do limite de duração da plataforma. O cliente só encurta o orçamento:
+    # budget=0 vale o padrão; sem deadline só com FILTRO_MAX_DURATION=0
+    try:
+        budget = float(value)
+    except (TypeError, ValueError):
+        return DEFAULT_TIME_BUDGET
+    if not budget > 0:
+        # 0, negativo ou NaN
+        return DEFAULT_TIME_BUDGET
+    return min(budget, DEFAULT_TIME_BUDGET) if DEFAULT_TIME_BUDGET else budget
+
+def progress_info(date, windows, fixtures, offset, processed):
+    # partial + token quando sobrou fixture sem processar
+    next_offset = offset + processed
+    info = {"total": len(fixtures), "offset": offset, "processed": processed, "partial": next_offset < len(fixtures)}
+    if info["partial"]:
+        info["continuation"] = encode_continuation(date, windows, next_offset, _slate_hash(fixtures))
+    return info
+
+def evaluate_slate(items, windows, workers, batch_stats, bulk, use_rolling, deadline=None, fixture_statistics=True):
+    # items: [(date, fixture)]; um único plano para todos os jogos, então históricos, statistics e
+    # features de um time são buscados/calculados uma vez mesmo que ele jogue em várias datas
+    lastN = max(windows)
+    slate = [f for _, f in items]
+    # planejamento: status/liga/horário decidem quais chamadas são necessárias, sem tocar o upstream
+    with metrics.phase("plan"):
+        plan = build_slate_plan(slate)
+        if not fixture_statistics:
+            plan.skip_statistics_of([fixture_id_of(f) for f in slate], "live")
+        team_features = rolling_features(plan, lastN) if use_rolling else {}
+    # com o orçamento vencido, as fases de pré-busca são puladas: só o jogo garantido da fase
+    # seguinte ainda chama o upstream (e só até o corte do deadline)
+    known = None
+    histories = {}
+    if deadline is None or not deadline.expired():
+        with metrics.phase("histories"):
+            known = histories_from_leagues(plan, lastN, workers, deadline) if bulk else None
+            histories = prefetch_team_histories(plan, lastN, workers, deadline, known, skip=team_features)
+    stats_by_fixture = {}
+    ids = set()
+    if batch_stats and deadline is not None and deadline.expired():
+        _degraded("statistics")
+    elif batch_stats:
+        with metrics.phase("statistics"):
+            # statistics dos históricos e dos jogos do slate, deduplicadas e em lotes de /fixtures?ids=
+            ids = {fixture_id_of(h) for hist in histories.values() for h in hist if not h.get("statistics")}
+            ids.update(plan.statistics)
+            stats_by_fixture = fetch_statistics_batch(ids, workers, deadline)
+    # features dos times com histórico também numa única ida ao backend compartilhado
+    feature_cache.prefetch([feature_key(tid, hist[:lastN], stats_by_fixture) for tid, hist in histories.items()
+                            if tid and tid not in team_features])
+    with metrics.phase("fixtures"):
+        out = run_ordered(lambda item: process_fixture(item[1], item[0], lastN, plan, stats_by_fixture,
+                                                       histories=histories, score=False, windows=windows,
+                                                       team_features=team_features),
+                          items, workers, deadline, progress=True)
+    # sem o lote de statistics (stats=0) o proxy de finalizações não tem base: os rings ficam como estão
+    if use_rolling and batch_stats:
+        with metrics.phase("rolling"):
+            update_rolling(histories, slate, stats_by_fixture, league_teams=set(known or ()), requested=ids)
+    return out, plan
+
+def parse_range(start, end):
+    # from/to inclusivos, YYYY-MM-DD, no máximo MAX_RANGE_DAYS dias
+    try:
+        first = datetime.date.fromisoformat(str(start))
+        last = datetime.date.fromisoformat(str(end))
+    except ValueError:
+        raise ValueError("Parâmetros `from`/`to` inválidos. Formato YYYY-MM-DD")
+    if last < first:
+        raise ValueError("`to` deve ser igual ou posterior a `from`")
+    days = (last - first).days + 1
+    if days > MAX_RANGE_DAYS:
+        raise ValueError(f"Intervalo máximo de {MAX_RANGE_DAYS} dias")
+    return [(first + datetime.timedelta(days=i)).isoformat() for i in range(days)]
+
+def range_response(dates, windows, workers, batch_stats, bulk, use_rolling, deadline, merged, with_meta, view,
+                   rkey=None):
+    # várias datas num job só: os slates vêm em paralelo e compartilham um único plano;
+    # a resposta é agrupada por data ou, com ?merged=1, um ranking único
+    with metrics.phase("slate"):
+        slates = run_ordered(get_fixtures_by_date, dates, workers, deadline)
+    items = []
+    per_date = {}
+    slate = []
+    for d, fixtures in zip(dates, slates):
+        if fixtures is SKIPPED:
+            per_date[d] = {"total": None, "processed": 0}
+            continue
+        warehouse.store_fixtures(fixtures)
+        slate.extend(fixtures)
+        fixtures = select_fixtures(fixtures, view)
+        items.extend((d, f) for f in fixtures)
+        per_date[d] = {"total": len(fixtures), "processed": 0}
+    out, plan = evaluate_slate(items, windows, workers, batch_stats, bulk, use_rolling, deadline)
+    by_date = {d: [] for d in dates}
+    for (d, _), m in zip(items, out):
+        if m is not SKIPPED:
+            by_date[d].append(m)
+            per_date[d]["processed"] += 1
+    count = sum(len(ms) for ms in by_date.values())
+    partial = any(p["total"] is None or p["processed"] < p["total"] for p in per_date.values())
+    # parcial ou não, o corpo sempre diz quanto de cada data foi processado (sem depender de ?meta=1)
+    body = {"from": dates[0], "to": dates[-1], "partial": partial, "progress": per_date}
+    keep = result_filter(view)
+    with metrics.phase("score"):
+        if merged:
+            body["matches"] = present(score_and_rank([m for d in dates for m in by_date[d]], view["top"], keep), view)
+        else:
+            body["dates"] = {d: present(score_and_rank(by_date[d], view["top"], keep), view) for d in dates}
+    if with_meta:
+        meta = build_meta(None, windows, count, plan)
+        del meta["date"]
+        meta.update({"from": dates[0], "to": dates[-1], "dates": per_date, "partial": partial})
+        body["_meta"] = meta
+    with metrics.phase("serialize"):
+        resp = jsonify(body)
+    if partial:
+        # mesmo header da lista de uma data (não há continuação no intervalo)
+        resp.headers["X-Filtro-Partial"] = "1"
+    return cache_result(resp, rkey, slate_final(dates, slate), partial)
+
+def result_key(dates, windows, view, **flags):
+    # tudo que muda o corpo da resposta; workers/budget não entram
+    norm = {k: sorted(v) if isinstance(v, set) else v for k, v in view.items()}
+    raw = json.dumps({"dates": dates, "last": windows, "view": norm, "flags": flags, "stats": teamstats.VERSION},
+                     sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+def slate_final(dates, fixtures):
+    # slate imutável: data passada e todo jogo encerrado (ou adiado/cancelado)
+    today = datetime.datetime.now(datetime.timezone.utc).date().isoformat()
+    if any(d >= today for d in dates):
+        return False
+    return all(warehouse.is_finished(f) or fixture_status(f) in planner.DEAD_STATUSES for f in fixtures)
+
+def cache_control(final):
+    if final:
+        return f"public, max-age=300, s-maxage={EDGE_MAXAGE_FINAL}, stale-while-revalidate=86400"
+    return f"public, max-age=0, s-maxage={EDGE_MAXAGE_LIVE}, stale-while-revalidate={EDGE_MAXAGE_LIVE}"
+
+def cached_response(entry, state="HIT"):
+    # resposta a partir do corpo já serializado; If-None-Match igual vira 304 sem corpo.
+    # entry: (corpo, final) ou (corpo, final, mimetype) — o NDJSON do modo stream
+    body, final = entry[0], entry[1]
+    resp = Response(body, mimetype=entry[2] if len(entry) > 2 else "application/json")
+    resp.set_etag(hashlib.sha256(body.encode("utf-8")).hexdigest()[:32])
+    resp.headers["Cache-Control"] = cache_control(final)
+    resp.headers["X-Filtro-Cache"] = state
+    return resp.make_conditional(request)
+
+def cache_result(resp, rkey, final, partial):
+    # guarda só respostas completas; parcial, degradada (histórico/statistics recusados ou com falha)
+    # ou diagnóstico (_meta) não vai para edge nem cache
+    degraded = degraded_reasons()
+    if degraded:
+        resp.headers["X-Filtro-Degraded"] = ",".join(sorted(degraded))
+    if partial or degraded or rkey is None:
+        resp.headers["Cache-Control"] = "no-store"
+        return resp
+    entry = (resp.get_data(as_text=True), final)
+    if RESULT_CACHE:
+        result_cache.set(rkey, entry, RESULT_TTL_FINAL if final else RESULT_TTL_LIVE)
+    return cached_response(entry, "MISS")
+
 @app.route("/api/filtro", methods=["GET", "POST"])
 def api_filtro():
     # aceita GET ?date=YYYY-MM-DD&last=10 ou POST com JSON {"date":"YYYY-MM-DD","last":10}
     try:
-        if request.method == "POST":
-            body = request.get_json(silent=True) or {}
-            date = body.get("date") or body.get("d")
-            lastN = int(body.get("last", 10))
-        else:
-            date = request.args.get("date") or request.args.get("d")
-            lastN = int(request.args.get("last") or 10)
+        # GET lê da query string; POST do corpo JSON (mesmos nomes de parâmetro)
+        params = (request.get_json(silent=True) or {}) if request.method == "POST" else request.args
+        deadline = Deadline(_resolve_budget(params.get("budget")))
+        _current_deadline.set(deadline)
+        date = params.get("date") or params.get("d")
+        try:
+            windows = parse_windows(params.get("last"))
+        except ValueError:
+            return jsonify({"error": "Parâmetro `last` inválido. Use um inteiro ou uma lista (ex.: 3,5,8,10)"}), 400
+        workers = _resolve_workers(params.get("workers"))
+        with_meta = _flag(params.get("meta"))
+        batch_stats = _flag(params.get("stats", BATCH_STATS))
+        stream = _flag(params.get("stream"))
+        bulk = _flag(params.get("bulk", BULK_LEAGUES))
+        use_rolling = _flag(params.get("rolling", ROLLING))
+        try:
+            view = parse_view(params)
+        except ValueError as ve:
+            return jsonify({"error": str(ve)}), 400
+        if params.get("from") or params.get("to"):
+            if stream or params.get("continuation"):
+                return jsonify({"error": "`from`/`to` não combina com `stream` nem `continuation`"}), 400
+            try:
+                dates = parse_range(params.get("from") or params.get("to"), params.get("to") or params.get("from"))
+            except ValueError as ve:
+                return jsonify({"error": str(ve)}), 400
+            if not keys:
+                return jsonify({"error": NO_KEY_ERROR}), 500
+            merged = _flag(params.get("merged"))
+            rkey = None if with_meta else result_key(dates, windows, view, stats=batch_stats, bulk=bulk,
+                                                     rolling=use_rolling, merged=merged)
+            hit = result_cache.get(rkey) if rkey and RESULT_CACHE else None
+            if hit is not None:
+                return cached_response(hit)
+            return range_response(dates, windows, workers, batch_stats, bulk, use_rolling, deadline,
+                                  merged, with_meta, view, rkey)
+        cont = None
+        if params.get("continuation"):
+            try:
+                cont = decode_continuation(params.get("continuation"))
+            except ValueError as ve:
+                return jsonify({"error": str(ve)}), 400
+            if date and date != cont["date"]:
+                return jsonify({"error": "Token de continuação pertence a outra data"}), 400
+            # a continuação mantém os parâmetros da primeira chamada
+            date = cont["date"]
+            windows = cont["windows"]
         if not date:
             return jsonify({"error": "Parâmetro `date` obrigatório. Formato YYYY-MM-DD"}), 400
-        if not API_KEY:
-            return jsonify({"error": "API key não configurada. Defina API_FOOTBALL_KEY nas env vars."}), 500
+        if not keys:
+            return jsonify({"error": NO_KEY_ERROR}), 500
+        # slate já calculado: nem o upstream nem o fan-out são tocados. O stream também entra
+        # (a linha de resumo sempre traz o _meta — na réplica, só os campos de RESULT_META —, então
+        # ?meta= não muda o corpo dele)
+        rkey = None
+        if not cont and (stream or not with_meta):
+            rkey = result_key([date], windows, view, stats=batch_stats, bulk=bulk, rolling=use_rolling,
+                              stream=stream)
+            hit = result_cache.get(rkey) if RESULT_CACHE else None
+            if hit is not None:
+                return cached_response(hit)
 
-        fixtures = get_fixtures_by_date(date)
-        out = []
-        # processa sequencialmente para economizar cota
-        for f in fixtures:
-            fixture_id = f.get("fixture", {}).get("id") or f.get("id")
-            homeTeam = f.get("teams", {}).get("home") or f.get("home") or {}
-            awayTeam = f.get("teams", {}).get("away") or f.get("away") or {}
-
-            home_last = get_last_fixtures_for_team(homeTeam.get("id"), lastN) if homeTeam.get("id") else []
-            away_last = get_last_fixtures_for_team(awayTeam.get("id"), lastN) if awayTeam.get("id") else []
-
-            home_ht_pct = compute_ht_goal_pct_from_last_fixtures(home_last, homeTeam.get("id")) if homeTeam.get("id") else 0.0
-            away_ht_pct = compute_ht_goal_pct_from_last_fixtures(away_last, awayTeam.get("id")) if awayTeam.get("id") else 0.0
-
-            home_avg_shots_ht = estimate_avg_shots_ht_from_fixtures(home_last, homeTeam.get("id")) if homeTeam.get("id") else 0.0
-            away_avg_shots_ht = estimate_avg_shots_ht_from_fixtures(away_last, awayTeam.get("id")) if awayTeam.get("id") else 0.0
-
-            stats = get_statistics_for_fixture(fixture_id) if fixture_id else []
-            home_xg_ht = away_xg_ht = 0.0
-            if isinstance(stats, list) and len(stats) > 0:
-                for s in stats:
-                    tid = s.get("team", {}).get("id") if isinstance(s.get("team"), dict) else None
-                    if not s.get("statistics"):
-                        continue
-                    # procurar xG
-                    for st in s.get("statistics", []):
-                        typ = (st.get("type") or st.get("name") or "").lower()
-                        val = st.get("value")
-                        if "xg" in typ and isinstance(val, (int, float)):
-                            if int(tid) == int(homeTeam.get("id")):
-                                home_xg_ht = float(val)
-                            if int(tid) == int(awayTeam.get("id")):
-                                away_xg_ht = float(val)
-                    # fallback: shots -> dividir por 2
-                    if not home_xg_ht or not away_xg_ht:
-                        for st in s.get("statistics", []):
-                            typ = (st.get("type") or st.get("name") or "").lower()
-                            val = st.get("value")
-                            if "shot" in typ and isinstance(val, (int, float)):
-                                if int(tid) == int(homeTeam.get("id")):
-                                    home_xg_ht = home_xg_ht or (float(val) / 2.0)
-                                if int(tid) == int(awayTeam.get("id")):
-                                    away_xg_ht = away_xg_ht or (float(val) / 2.0)
-
-            match_obj = {
-                "id": fixture_id or f.get("id") or f"{homeTeam.get('id')}-{awayTeam.get('id')}-{date}",
-                "date": date,
-                "league": f.get("league"),
-                "home": {
-                    "id": homeTeam.get("id"),
-                    "name": homeTeam.get("name"),
-                    "ht_goal_pct": round(home_ht_pct, 4),
-                    "avg_shots_ht": round(home_avg_shots_ht, 2),
-                    "xG_ht": round(home_xg_ht, 4),
-                },
-                "away": {
-                    "id": awayTeam.get("id"),
-                    "name": awayTeam.get("name"),
-                    "ht_goal_pct": round(away_ht_pct, 4),
-                    "avg_shots_ht": round(away_avg_shots_ht, 2),
-                    "xG_ht": round(away_xg_ht, 4),
-                },
-                "raw": f,
-            }
-
-            out.append(compute_match_percentages_and_filter(match_obj))
+        with metrics.phase("slate"):
+            fixtures = get_fixtures_by_date(date)
+        # jogos encerrados do dia viram histórico persistido para as próximas consultas
+        warehouse.store_fixtures(fixtures)
+        # o hash da continuação cobre o slate já filtrado: mudar os filtros invalida o token
+        fixtures = select_fixtures(fixtures, view)
+        offset = 0
+        if cont:
+            if cont["hash"] != _slate_hash(fixtures):
+                return jsonify({"error": "A lista de jogos da data mudou; recomece sem `continuation`"}), 409
+            offset = min(cont["offset"], len(fixtures))
+        if stream:
+            return stream_response(fixtures, date, windows, workers, batch_stats, offset, deadline, bulk, use_rolling,
+                                   view, rkey, slate_final([date], fixtures))
+        pending = fixtures[offset:]
+        # fan-out limitado: a ordem de saída segue a ordem de `fixtures`; com o orçamento de tempo
+        # esgotado, os jogos ainda não despachados ficam para a próxima chamada (continuation)
+        out, plan = evaluate_slate([(date, f) for f in pending], windows, workers, batch_stats, bulk,
+                                   use_rolling, deadline)
+        out = [m for m in out if m is not SKIPPED]
+        processed = len(out)
 
-        # ordenar por score descendente
-        out = sorted(out, key=lambda x: x.get("_filter", {}).get("score", 0), reverse=True)
-        return jsonify(out)
+        # pontuar e ordenar por score descendente (empates mantêm a ordem de `fixtures`)
+        with metrics.phase("score"):
+            out = score_and_rank(out, view["top"], result_filter(view))
+        meta = build_meta(date, windows, len(out), plan)
+        meta.update(progress_info(date, windows, fixtures, offset, processed))
+        return cache_result(build_response(present(out, view), meta, with_meta), rkey,
+                            slate_final([date], fixtures), meta["partial"])
     except requests.HTTPError as he:
         app.logger.exception("Erro HTTP ao chamar API externa")
         return jsonify({"error": "Erro ao acessar API externa", "detail": str(he)}), 502
@@ -222,104 +1236,295 @@ def api_filtro():
         app.logger.exception("Erro interno /api/filtro")
         return jsonify({"error": "Erro interno", "detail": str(e)}), 500
 
-# entrypoint para servidores WSGI/hosting que usam this file directly
-if __name__ == "__main__":
-    # roda localmente para testes
-    app.run(host="0.0.0.0", port=int(os.environ.get("PORT", 3000)), debug=True)
+def get_live_fixtures():
+    r = fetcher("/fixtures", {"live": "all"})
+    return r.get("response") or r.get("data") or []
+
+def _fixture_date(f):
+    return ((f.get("fixture") or {}).get("date") or "")[:10]
+
+def evaluate_live(changed, known, lastN):
+    # jogo já conhecido: o histórico dos times não muda durante a partida, então só o estado ao vivo
+    # (e, com LIVE_STATISTICS, o xG do próprio jogo) é atualizado; jogo novo passa pelo pipeline do slate
+    out = {}
+    fresh = [f for f in changed if fixture_id_of(f) not in known]
+    seen = [f for f in changed if fixture_id_of(f) in known]
+    stats_by_fixture = fetch_statistics_batch([fixture_id_of(f) for f in seen]) if LIVE_STATISTICS and seen else {}
+    for f in seen:
+        fid = fixture_id_of(f)
+        m = dict(known[fid])
+        m["raw"] = f
+        m["live"] = live.live_state(f)
+        if fid in stats_by_fixture:
+            home_xg, away_xg = fixture_xg(stats_by_fixture[fid], m["home"]["id"], m["away"]["id"])
+            m["home"] = dict(m["home"], xG_ht=round(home_xg, 4))
+            m["away"] = dict(m["away"], xG_ht=round(away_xg, 4))
+        out[fid] = compute_match_percentages_and_filter(m)
+    if fresh:
+        # o que não couber no orçamento fica fora do snapshot e volta no próximo poll
+        deadline = Deadline(DEFAULT_TIME_BUDGET)
+        token = _current_deadline.set(deadline)
+        try:
+            results, _ = evaluate_slate([(_fixture_date(f), f) for f in fresh], [lastN], MAX_WORKERS, BATCH_STATS,
+                                        False, ROLLING, deadline, fixture_statistics=LIVE_STATISTICS)
+        finally:
+            _current_deadline.reset(token)
+        for f, m in zip(fresh, results):
+            if m is SKIPPED:
+                continue
+            m["live"] = live.live_state(f)
+            out[fixture_id_of(f)] = compute_match_percentages_and_filter(m)
+    return out
+
+live_feeds = {}
+_live_lock = threading.Lock()
+
+def live_feed(lastN):
+    # um feed por janela `last` na instância, compartilhado por todos os clientes
+    with _live_lock:
+        feed = live_feeds.get(lastN)
+        if feed is None:
+            feed = live_feeds[lastN] = live.Feed(get_live_fixtures,
+                                                 lambda changed, known: evaluate_live(changed, known, lastN),
+                                                 LIVE_INTERVAL)
+    return feed
+
+def _live_visible(m, view, keep):
+    return bool(select_fixtures([{"league": m.get("league")}], view)) and (keep is None or keep(m))
+
+def _sse(event, version, data):
+    return f"id: {version}\nevent: {event}\ndata: {json.dumps(data, ensure_ascii=False, separators=(',', ':'))}\n\n"
+
+def live_stream(feed, view, last_event_id):
+    # snapshot na conexão (ou só os deltas perdidos, com Last-Event-ID) e depois um evento por versão;
+    # filtros da view por cliente: jogo que deixa de passar vai em `removed`
+    keep = result_filter(view)
+    visible = lambda m: _live_visible(m, view, keep)
+
+    def snapshot():
+        version, matches = feed.snapshot()
+        matches = sorted((m for m in matches if visible(m)), key=lambda m: -m.get("_filter", {}).get("score", 0))
+        return version, _sse("snapshot", version, {"version": version, "matches": present(matches, view)})
+
+    def delta(version, changed, removed):
+        shown = [m for m in changed if visible(m)]
+        hidden = [m.get("id") for m in changed if not visible(m)]
+        return _sse("delta", version, {"version": version, "changed": present(shown, view),
+                                       "removed": list(removed) + hidden})
+
+    def generate():
+        feed.subscribe(1)
+        try:
+            yield f"retry: {LIVE_RETRY_MS}\n\n"
+            events = feed.since(last_event_id) if last_event_id is not None else None
+            if events is None:
+                try:
+                    feed.maybe_poll()
+                except Exception:
+                    app.logger.exception("Falha no poll ao vivo")
+                version, chunk = snapshot()
+                yield chunk
+            else:
+                version = last_event_id
+                for version, changed, removed in events:
+                    yield delta(version, changed, removed)
+            end = time.monotonic() + LIVE_STREAM_SECONDS
+            while True:
+                remaining = end - time.monotonic()
+                if remaining <= 0:
+                    break
+                if not feed.wait(version, min(remaining, LIVE_PING)):
+                    yield ": ping\n\n"
+                    continue
+                events = feed.since(version)
+                if events is None:
+                    version, chunk = snapshot()
+                    yield chunk
+                    continue
+                for version, changed, removed in events:
+                    yield delta(version, changed, removed)
+        finally:
+            feed.subscribe(-1)
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return Response(generate(), mimetype="text/event-stream", headers=headers)
+
+@app.route("/api/live", methods=["GET"])
+def api_live():
+    # ?last=5[&league=][&country=][&only_pass=1][&min_score=][&fields=][&format=json]
+    # SSE (text/event-stream): eventos `snapshot` e `delta`, id = versão do feed
+    params = request.args
+    try:
+        lastN = parse_windows(params.get("last"))[0]
+    except ValueError:
+        return jsonify({"error": "Parâmetro `last` inválido"}), 400
+    if lastN > LIVE_MAX_LAST:
+        return jsonify({"error": f"`last` máximo no modo ao vivo é {LIVE_MAX_LAST}"}), 400
+    try:
+        # eventos pequenos: sem o fixture bruto por padrão
+        view = parse_view(dict(params.items(), compact=params.get("compact", "1")))
+    except ValueError as ve:
+        return jsonify({"error": str(ve)}), 400
+    if not keys:
+        return jsonify({"error": NO_KEY_ERROR}), 500
+    feed = live_feed(lastN)
+    if params.get("format") == "json":
+        try:
+            feed.maybe_poll()
+        except requests.HTTPError as he:
+            return jsonify({"error": "Erro ao acessar API externa", "detail": str(he)}), 502
+        version, matches = feed.snapshot()
+        keep = result_filter(view)
+        matches = [m for m in matches if _live_visible(m, view, keep)]
+        matches.sort(key=lambda m: -m.get("_filter", {}).get("score", 0))
+        resp = jsonify({"version": version, "matches": present(matches, view), "_meta": feed.stats()})
+        resp.headers["Cache-Control"] = "no-store"
+        return resp
+    last_event_id = request.headers.get("Last-Event-ID") or params.get("lastEventId")
+    try:
+        last_event_id = int(last_event_id) if last_event_id not in (None, "") else None
+    except ValueError:
+        last_event_id = None
+    return live_stream(feed, view, last_event_id)
+
+def _day_ts(day):
+    return int(datetime.datetime.combine(day, datetime.time(), datetime.timezone.utc).timestamp())
+
+def run_backtest(start, end, last, min_history, view, bucket=20, detail=False):
+    # replay de [start, end] (datas inclusivas) só com o warehouse: uma leitura do intervalo + lookback,
+    # statistics num lote, janelas por bisect e pontuação do lote inteiro de uma vez
+    start_ts = _day_ts(start)
+    end_ts = _day_ts(end + datetime.timedelta(days=1))
+    with metrics.phase("load"):
+        fixtures = warehouse.fixtures_between(start_ts - BACKTEST_LOOKBACK_DAYS * 86400, end_ts)
+        stats_by_fixture = warehouse.get_statistics_many(fixture_id_of(f) for f in fixtures if fixture_id_of(f))
+    select = None
+    if view["leagues"] or view["countries"]:
+        select = lambda f: bool(select_fixtures([f], view))
+    with metrics.phase("replay"):
+        rows, leagues = backtest.replay(fixtures, start_ts, end_ts, last, min_history,
+                                        ht_scored, ht_shots_proxy, stats_by_fixture, select)
+    with metrics.phase("score"):
+        matches = [m for _, m in rows]
+        if VECTOR_SCORING and scoring.available():
+            scoring.apply(matches)
+        else:
+            for m in matches:
+                compute_match_percentages_and_filter(m)
+    with metrics.phase("aggregate"):
+        report = backtest.summarize(rows, leagues, bucket)
+    if detail:
+        report["fixtures_detail"] = [
+            {"id": fixture_id_of(f), "date": ((f.get("fixture") or {}).get("date") or "")[:10],
+             "league_id": (f.get("league") or {}).get("id"),
+             "home": _fixture_teams(f)[0].get("name"), "away": _fixture_teams(f)[1].get("name"),
+             "score": m["_filter"]["score"], "pass": m["_filter"]["pass"], "ht_goal": m["actual"],
+             "derived": m["_filter"]["derived"]}
+            for f, m in rows
+        ]
+    meta = {"from": start.isoformat(), "to": end.isoformat(), "last": last, "min_history": min_history,
+            "bucket": bucket, "loaded_fixtures": len(fixtures), "loaded_statistics": len(stats_by_fixture),
+            "lookback_days": BACKTEST_LOOKBACK_DAYS, "vector_scoring": bool(VECTOR_SCORING and scoring.available())}
+    timings = metrics.current()
+    if timings is not None:
+        meta["timings"] = timings.as_dict()
+    report["_meta"] = meta
+    return report
+
+@app.route("/api/backtest", methods=["GET", "POST"])
+def api_backtest():
+    # ?from=YYYY-MM-DD&to=YYYY-MM-DD&last=10[&min_history=][&league=][&country=][&bucket=20][&detail=1]
+    # sem chamadas ao upstream: só o que já está no warehouse (alimentado pelo próprio /api/filtro)
+    params = (request.get_json(silent=True) or {}) if request.method == "POST" else request.args
+    try:
+        start = datetime.date.fromisoformat(str(params.get("from") or ""))
+        end = datetime.date.fromisoformat(str(params.get("to") or params.get("from")))
+    except ValueError:
+        return jsonify({"error": "Parâmetros `from`/`to` inválidos. Formato YYYY-MM-DD"}), 400
+    if end < start:
+        return jsonify({"error": "`to` deve ser igual ou posterior a `from`"}), 400
+    if (end - start).days + 1 > BACKTEST_MAX_DAYS:
+        return jsonify({"error": f"Intervalo máximo de {BACKTEST_MAX_DAYS} dias"}), 400
+    try:
+        last = parse_windows(params.get("last"))[0]
+        min_history = int(params.get("min_history") or last)
+        bucket = float(params.get("bucket") or 20)
+    except ValueError:
+        return jsonify({"error": "Parâmetros `last`/`min_history`/`bucket` inválidos"}), 400
+    try:
+        view = parse_view(params)
+    except ValueError as ve:
+        return jsonify({"error": str(ve)}), 400
+    if min_history < 1 or bucket <= 0:
+        return jsonify({"error": "`min_history` deve ser >= 1 e `bucket` > 0"}), 400
+    if not warehouse.ENABLED:
+        return jsonify({"error": "Warehouse desabilitado (FILTRO_WAREHOUSE=0): nada para reproduzir"}), 503
+    report = run_backtest(start, end, last, min_history, view, bucket, _flag(params.get("detail")))
+    with metrics.phase("serialize"):
+        return jsonify(report)
+
+@app.before_request
+def _start_timings():
+    g.started = time.perf_counter()
+    g.timings = metrics.start_request()
+    cache.start_request()
+    # a thread é reaproveitada entre requisições: só /api/filtro define um deadline
+    _current_deadline.set(None)
+
+@app.after_request
+def _finish_timings(resp):
+    timings = getattr(g, "timings", None)
+    if timings is None:
+        return resp
+    if not resp.is_streamed:
+        resp.headers["Server-Timing"] = timings.server_timing()
+    rule = request.url_rule.rule if request.url_rule else "unmatched"
+    metrics.record_request(rule, resp.status_code, time.perf_counter() - g.started)
+    return resp
+
+@metrics.registry.collector
+def _instance_metrics():
+    # stats que já existem para o _meta, expostos como gauges
+    caches = {"team_history": team_history_cache, "features": feature_cache, "results": result_cache,
+              "league_index": league_index_cache, "stats_index": teamstats}
+    families = [("filtro_cache", "gauge", "Contadores dos caches da instância",
+                 [({"cache": name, "stat": k}, v) for name, c in caches.items()
+                  for k, v in metrics.stats_samples(c.stats())])]
+    for name, text, stats in (
+        ("filtro_ratelimit", "Estado do token bucket e da cota diária", ratelimit.limiter.snapshot()),
+        ("filtro_singleflight", "Chamadas coalescidas pelo singleflight", inflight.stats()),
+        ("filtro_warehouse", "Contadores do warehouse SQLite", warehouse.stats()),
+        ("filtro_rolling", "Agregados móveis por time", rolling.store.stats()),
+    ):
+        families.append((name, "gauge", text, [({"stat": k}, v) for k, v in metrics.stats_samples(stats)]))
+    if keys:
+        families.append(("filtro_api_key", "gauge", "Uso e cota por chave da API (rótulo, nunca a chave)",
+                         [({"key": k["key"], "stat": stat}, v) for k in keys.snapshot()["keys"]
+                          for stat, v in metrics.stats_samples({s: k[s] for s in k if s not in ("key", "fingerprint")})]))
+    if live_feeds:
+        families.append(("filtro_live", "gauge", "Feeds ao vivo (polls, jogos alterados, assinantes)",
+                         [({"last": n, "stat": k}, v) for n, feed in list(live_feeds.items())
+                          for k, v in metrics.stats_samples(feed.stats())]))
+    return families
+
+@app.route("/api/metrics", methods=["GET"])
+def api_metrics():
+    # contadores da instância (cada instância serverless tem os seus) no formato texto do Prometheus;
+    # com FILTRO_METRICS_TOKEN definido, exige ?token= ou Authorization: Bearer
+    token = os.environ.get("FILTRO_METRICS_TOKEN")
+    if token:
+        given = request.args.get("token") or request.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+        if given != token:
+            return jsonify({"error": "Token inválido"}), 401
+    return Response(metrics.registry.render(), mimetype="text/plain; version=0.0.4")
+
 # rota simples para servir a página de teste no mesmo app Flask
 @app.route("/testar", methods=["GET"])
 def testar_page():
-    html = """
-<!doctype html>
-<html>
-<head>
-  <meta charset="utf-8"/>
-  <title>Testar — Filtro HT</title>
-  <style>
-    body{font-family:Arial,Helvetica,sans-serif;max-width:980px;margin:24px auto;padding:12px}
-    .card{border:1px solid #ddd;padding:12px;border-radius:8px;margin-bottom:10px}
-    .pass{color:green;font-weight:700}
-    .fail{color:#c00;font-weight:700}
-    pre{white-space:pre-wrap;background:#f7f7f7;padding:10px;border-radius:6px;overflow:auto}
-  </style>
-</head>
-<body>
-  <h1>Testar — Filtro HT</h1>
-
-  <div class="card">
-    <label>Data: <input id="date" type="date" value="2025-12-05"/></label>
-    <label style="margin-left:12px">Últimos (last):
-      <select id="last">
-        <option value="3">3</option>
-        <option value="5" selected>5</option>
-        <option value="8">8</option>
-        <option value="10">10</option>
-      </select>
-    </label>
-    <div style="margin-top:10px">
-      <button id="btnFetch">Buscar jogos</button>
-      <button id="btnClear">Limpar</button>
-    </div>
-    <div id="log" style="margin-top:8px;color:#555"></div>
-  </div>
-
-  <div id="results"></div>
-
-  <script>
-    const btn = document.getElementById('btnFetch');
-    const btnClear = document.getElementById('btnClear');
-    const resultsEl = document.getElementById('results');
-    const logEl = document.getElementById('log');
-
-    btn.addEventListener('click', async () => {
-      const date = document.getElementById('date').value;
-      const last = document.getElementById('last').value;
-      if (!date) { alert('Escolha uma data'); return; }
-      logEl.textContent = `Buscando ${date} (last=${last}) ...`;
-      resultsEl.innerHTML = '';
-      try {
-        const res = await fetch(`/api/filtro?date=${date}&last=${last}`);
-        if (!res.ok) {
-          const txt = await res.text();
-          logEl.textContent = 'Erro: ' + res.status + ' — ' + txt;
-          return;
-        }
-        const data = await res.json();
-        logEl.textContent = `Retornou ${Array.isArray(data) ? data.length : 0} itens`;
-        if (!Array.isArray(data) || data.length === 0) {
-          resultsEl.innerHTML = '<div class="card">Nenhum jogo encontrado para essa data.</div>';
-          return;
-        }
-        // render simples
-        data.forEach(m => {
-          const pass = m._filter?.pass;
-          const html = `
-            <div class="card">
-              <div style="display:flex;justify-content:space-between;align-items:center">
-                <div><strong>${m.home?.name || 'Home'} × ${m.away?.name || 'Away'}</strong>
-                <div style="color:#666;font-size:13px">pct(max): ${Number(m._filter?.derived?.max_pct||0).toFixed(3)} • shots: ${Number(m._filter?.derived?.total_shots||0).toFixed(2)} • xG: ${Number(m._filter?.derived?.avg_xg||0).toFixed(2)}</div>
-                </div>
-                <div style="text-align:right">
-                  <div class="${pass ? 'pass' : 'fail'}">${pass ? 'PASS' : 'FAIL'}</div>
-                  <div style="font-size:12px">Score: ${Number(m._filter?.score||0).toFixed(2)}</div>
-                </div>
-              </div>
-            </div>
-          `;
-          resultsEl.insertAdjacentHTML('beforeend', html);
-        });
-      } catch (e) {
-        logEl.textContent = 'Erro: ' + e;
-      }
-    });
-
-    btnClear.addEventListener('click', () => {
-      resultsEl.innerHTML = '';
-      logEl.textContent = '';
-    });
-  </script>
-</body>
-</html>
-    """
-    return html, 200, {"Content-Type": "text/html; charset=utf-8"}
+    # HTML e gzip montados uma vez por instância (_lib/pages.py), com ETag e cache longo
+    return pages.testar.response(request)
 
+# entrypoint para servidores WSGI/hosting que usam this file directly
+if __name__ == "__main__":
+    # roda localmente para testes
+    app.run(host="0.0.0.0", port=int(os.environ.get("PORT", 3000)), debug=True)
@@ -0,0 +1,86 @@
+# bench/backtest.py
+# Backtest do filtro HT pela linha de comando: mesmo código de /api/backtest, lendo um warehouse
+# local (o arquivo SQLite que o /api/filtro alimenta). Sem chave e sem chamadas ao upstream.
+#
+#   python bench/backtest.py --db /tmp/filtro_ht.sqlite3 --from 2025-08-01 --to 2026-05-31 --last 10
+#   python bench/backtest.py --synth-fixtures 200 --synth-rounds 120 --from 2025-01-01 --to 2025-12-31
+
+import argparse
+import importlib.util
+import json
+import os
+import sys
+import tempfile
+import time
+from urllib.parse import urlencode
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+def load_filtro(db_path):
+    # o warehouse lê o caminho no import
+    os.environ["FILTRO_WAREHOUSE_PATH"] = db_path
+    os.environ["FILTRO_WAREHOUSE"] = "1"
+    api_dir = os.path.join(ROOT, "api")
+    sys.path.insert(0, api_dir)
+    spec = importlib.util.spec_from_file_location("filtro", os.path.join(api_dir, "filtro.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def seed_synth(m, args):
+    # temporada sintética (bench/synth.py) gravada no warehouse, com statistics dos jogos encerrados
+    from synth import generate
+    ds = generate(args.synth_fixtures, args.seed, args.end, rounds=args.synth_rounds)
+    m.warehouse.store_fixtures(ds.fixtures)
+    for f in ds.fixtures:
+        if m.warehouse.is_finished(f):
+            m.warehouse.store_statistics(f["fixture"]["id"], ds.statistics.get(f["fixture"]["id"], []))
+    return sum(1 for f in ds.fixtures if m.warehouse.is_finished(f))
+
+def main():
+    ap = argparse.ArgumentParser(description="Backtest do filtro HT sobre o warehouse local")
+    ap.add_argument("--db", help="warehouse SQLite (padrão: arquivo temporário, use com --synth-fixtures)")
+    ap.add_argument("--from", dest="start", required=True)
+    ap.add_argument("--to", dest="end", required=True)
+    ap.add_argument("--last", type=int, default=10)
+    ap.add_argument("--min-history", type=int)
+    ap.add_argument("--league", help="ids ou nomes separados por vírgula")
+    ap.add_argument("--country")
+    ap.add_argument("--bucket", type=float, default=20)
+    ap.add_argument("--detail", action="store_true", help="inclui cada jogo avaliado")
+    ap.add_argument("--synth-fixtures", type=int, default=0, help="popula o warehouse com N jogos por rodada")
+    ap.add_argument("--synth-rounds", type=int, default=120)
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--json", help="grava o relatório neste arquivo")
+    args = ap.parse_args()
+
+    db = args.db or os.path.join(tempfile.mkdtemp(prefix="filtro-backtest-"), "warehouse.sqlite3")
+    m = load_filtro(db)
+    if args.synth_fixtures:
+        t0 = time.perf_counter()
+        stored = seed_synth(m, args)
+        print(f"warehouse sintético: {stored} jogos em {time.perf_counter() - t0:.1f}s", file=sys.stderr)
+
+    params = {"from": args.start, "to": args.end, "last": args.last, "bucket": args.bucket}
+    for key, value in (("min_history", args.min_history), ("league", args.league), ("country", args.country)):
+        if value is not None:
+            params[key] = value
+    if args.detail:
+        params["detail"] = 1
+    t0 = time.perf_counter()
+    r = m.app.test_client().get("/api/backtest?" + urlencode(params))
+    elapsed = time.perf_counter() - t0
+    report = r.get_json()
+    if r.status_code != 200:
+        print(json.dumps(report, ensure_ascii=False), file=sys.stderr)
+        sys.exit(1)
+    report["_meta"]["elapsed_ms"] = round(elapsed * 1000, 1)
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2, ensure_ascii=False)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+# bench/coldstart.py
+# Cold start de cada função em api/*.py: em processos novos, mede o import do módulo e a primeira
+# requisição barata (sem upstream), como no runtime serverless. Mediana de N rodadas por função.
+#
+#   python bench/coldstart.py --runs 7 --json coldstart.json
+#   python bench/coldstart.py --importtime 15     # maiores imports (python -X importtime)
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+API_DIR = os.path.join(ROOT, "api")
+
+# rota barata de cada função (não toca o upstream)
+FUNCTIONS = {
+    "filtro": "/api/metrics",
+    "check_key": "/",
+    "testar": "/",
+}
+
+PROBE = r"""
+import importlib.util, json, sys, time
+t0 = time.perf_counter()
+sys.path.insert(0, {api_dir!r})
+spec = importlib.util.spec_from_file_location({name!r}, {path!r})
+m = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(m)
+t1 = time.perf_counter()
+r = m.app.test_client().get({route!r}, headers={{"Accept-Encoding": "gzip"}})
+r.get_data()
+t2 = time.perf_counter()
+print(json.dumps({{"import_ms": (t1 - t0) * 1000, "first_request_ms": (t2 - t1) * 1000,
+                  "status": r.status_code, "modules": len(sys.modules),
+                  "requests_loaded": "requests" in sys.modules, "numpy_loaded": "numpy" in sys.modules}}))
+"""
+
+def probe(name, route, env):
+    code = PROBE.format(api_dir=API_DIR, name=name, path=os.path.join(API_DIR, name + ".py"), route=route)
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def importtime(name, env, top):
+    code = f"import sys; sys.path.insert(0, {API_DIR!r}); import {name}"
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True,
+                         env=env, cwd=API_DIR)
+    rows = []
+    for line in out.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package"
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3:
+            continue
+        try:
+            cumulative_us = int(parts[1])
+        except ValueError:
+            continue  # linha de cabeçalho
+        rows.append((cumulative_us, parts[2].strip()))
+    rows.sort(reverse=True)
+    return [{"module": mod, "cumulative_ms": round(us / 1000.0, 2)} for us, mod in rows[:top]]
+
+def main():
+    ap = argparse.ArgumentParser(description="Cold start (import + primeira requisição) das funções em api/")
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--only", choices=sorted(FUNCTIONS), action="append")
+    ap.add_argument("--importtime", type=int, default=0, help="lista os N imports mais caros de cada função")
+    ap.add_argument("--json", help="grava o relatório neste arquivo")
+    args = ap.parse_args()
+
+    env = dict(os.environ)
+    # sem chave: nenhuma rota medida chama o upstream
+    env.pop("API_FOOTBALL_KEY", None)
+    env.setdefault("FILTRO_WAREHOUSE_PATH", os.path.join(tempfile.mkdtemp(prefix="filtro-cold-"), "wh.sqlite3"))
+
+    report = {"python": sys.version.split()[0], "runs": args.runs, "functions": {}}
+    for name in args.only or sorted(FUNCTIONS):
+        route = FUNCTIONS[name]
+        # a primeira rodada compila o bytecode (.pyc); as medidas vêm depois, como num deploy já buildado
+        probe(name, route, env)
+        samples = [probe(name, route, env) for _ in range(args.runs)]
+        imp = [s["import_ms"] for s in samples]
+        first = [s["first_request_ms"] for s in samples]
+        entry = {
+            "route": route,
+            "import_ms": {"median": round(statistics.median(imp), 2), "min": round(min(imp), 2),
+                          "max": round(max(imp), 2)},
+            "first_request_ms": {"median": round(statistics.median(first), 2), "min": round(min(first), 2)},
+            "cold_start_ms": round(statistics.median(a + b for a, b in zip(imp, first)), 2),
+            "status": samples[-1]["status"],
+            "modules_loaded": samples[-1]["modules"],
+            "requests_loaded": samples[-1]["requests_loaded"],
+            "numpy_loaded": samples[-1]["numpy_loaded"],
+        }
+        if args.importtime:
+            entry["top_imports"] = importtime(name, env, args.importtime)
+        report["functions"][name] = entry
+
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2, ensure_ascii=False)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# bench/resp_standin.py
+# Stand-in mínimo com protocolo do Redis (GET/SET PX/MGET/DEL/SCAN) para exercitar
+# FILTRO_CACHE_BACKEND=redis sem um servidor real
+
+import fnmatch
+import socketserver
+import threading
+import time
+
+class _Store:
+    def __init__(self):
+        self.data = {}
+        self.lock = threading.Lock()
+        self.commands = 0
+
+    def get(self, key, now):
+        item = self.data.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at is not None and expires_at <= now:
+            del self.data[key]
+            return None
+        return value
+
+def _bulk(value):
+    return b"$-1\r\n" if value is None else b"$%d\r\n%s\r\n" % (len(value), value)
+
+def serve(port=0):
+    store = _Store()
+
+    class Handler(socketserver.StreamRequestHandler):
+        def _command(self):
+            line = self.rfile.readline()
+            if not line:
+                return None
+            args = []
+            for _ in range(int(line[1:])):
+                size = int(self.rfile.readline()[1:])
+                args.append(self.rfile.read(size + 2)[:-2])
+            return args
+
+        def handle(self):
+            while True:
+                args = self._command()
+                if args is None:
+                    return
+                cmd = args[0].upper()
+                now = time.time()
+                with store.lock:
+                    store.commands += 1
+                    if cmd == b"GET":
+                        out = _bulk(store.get(args[1], now))
+                    elif cmd == b"MGET":
+                        out = b"*%d\r\n" % (len(args) - 1) + b"".join(_bulk(store.get(k, now)) for k in args[1:])
+                    elif cmd == b"SET":
+                        expires_at = None
+                        if len(args) > 4 and args[3].upper() == b"PX":
+                            expires_at = now + int(args[4]) / 1000.0
+                        store.data[args[1]] = (args[2], expires_at)
+                        out = b"+OK\r\n"
+                    elif cmd == b"DEL":
+                        out = b":%d\r\n" % sum(1 for k in args[1:] if store.data.pop(k, None) is not None)
+                    elif cmd == b"SCAN":
+                        pattern = args[args.index(b"MATCH") + 1].decode() if b"MATCH" in args else "*"
+                        keys = [k for k in store.data if fnmatch.fnmatchcase(k.decode(), pattern)]
+                        out = b"*2\r\n$1\r\n0\r\n*%d\r\n" % len(keys) + b"".join(_bulk(k) for k in keys)
+                    else:
+                        out = b"+OK\r\n"
+                self.wfile.write(out)
+
+    class Server(socketserver.ThreadingTCPServer):
+        allow_reuse_address = True
+        daemon_threads = True
+
+    server = Server(("127.0.0.1", port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    server.store = store
+    return server
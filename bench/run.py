@@ -0,0 +1,201 @@
+# bench/run.py
+# Benchmark offline de /api/filtro: sobe o stand-in da API-Football com um dataset gravado ou
+# sintético, carrega api/filtro.py em processo e mede latência (p50/p90/p99), chamadas ao upstream,
+# pico de memória e throughput sob carga concorrente. Mesma seed/dataset/parâmetros = números comparáveis.
+#
+#   python bench/run.py --fixtures 200 --requests 30 --concurrency 4
+#   python bench/run.py --data bench/data/sample_2025-12-06.json --mode warm --json out.json
+#   python bench/run.py --fixtures 500 --baseline out.json      # aponta regressões
+
+import argparse
+import gc
+import importlib.util
+import json
+import os
+import resource
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from synth import Dataset, generate
+from standin import StandIn
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    k = (len(values) - 1) * p
+    lo, hi = int(k), min(int(k) + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+def load_filtro(base, args, workdir):
+    # o módulo lê a configuração no import: o ambiente é montado antes
+    os.environ["API_FOOTBALL_KEY"] = "bench"
+    os.environ["API_FOOTBALL_BASE"] = base
+    os.environ["FILTRO_WAREHOUSE_PATH"] = os.path.join(workdir, "warehouse.sqlite3")
+    os.environ["FILTRO_CACHE_PATH"] = os.path.join(workdir, "cache.sqlite3")
+    os.environ.setdefault("FILTRO_RESULT_CACHE", "0")
+    # o token bucket do filtro acompanha o limite simulado (sem limite: não deve ser o gargalo)
+    os.environ["RATE_LIMIT_PER_MINUTE"] = str(args.rate_per_minute or 1000000)
+    # sem deadline: mede o slate inteiro, sem cortes do orçamento de tempo
+    os.environ["FILTRO_MAX_DURATION"] = "0"
+    if args.mode == "cold":
+        os.environ["FILTRO_WAREHOUSE"] = "0"
+        os.environ["FILTRO_ROLLING"] = "0"
+    if args.cache_backend:
+        os.environ["FILTRO_CACHE_BACKEND"] = args.cache_backend
+    if args.cache_backend == "redis" and not os.environ.get("FILTRO_CACHE_URL"):
+        import resp_standin
+        server = resp_standin.serve()
+        os.environ["FILTRO_CACHE_URL"] = f"redis://127.0.0.1:{server.server_address[1]}/0"
+    api_dir = os.path.join(ROOT, "api")
+    sys.path.insert(0, api_dir)
+    spec = importlib.util.spec_from_file_location("filtro", os.path.join(api_dir, "filtro.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def reset_caches(m):
+    # modo cold: cada requisição encontra a instância como recém-criada
+    for cache in (m.team_history_cache, m.feature_cache, m.result_cache, m.league_index_cache):
+        cache.clear()
+    m.rolling.store = m.rolling.RollingStore()
+
+def run(args):
+    ds = Dataset.load(args.data) if args.data else generate(args.fixtures, args.seed, live_ratio=args.live_ratio)
+    standin = StandIn(ds, args.latency_ms, args.jitter_ms, args.rate_per_minute, seed=args.seed)
+    base = standin.serve()
+    workdir = tempfile.mkdtemp(prefix="filtro-bench-")
+    m = load_filtro(base, args, workdir)
+    app = m.app
+    query = f"/api/filtro?date={ds.slate_date}&last={args.last}&workers={args.workers}"
+    if args.query:
+        query += "&" + args.query.lstrip("&")
+
+    def one(_):
+        if args.mode == "cold":
+            reset_caches(m)
+        client = app.test_client()
+        t0 = time.perf_counter()
+        r = client.get(query)
+        body = r.get_data()
+        elapsed = time.perf_counter() - t0
+        return elapsed, r.status_code, len(body)
+
+    # aquecimento fora da medição (imports tardios, conexões, e no modo warm os caches)
+    one(None)
+    standin.reset_counters()
+    gc.collect()
+
+    # cold com concorrência limparia caches no meio de outras requisições: serializa
+    concurrency = 1 if args.mode == "cold" else args.concurrency
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as ex:
+        results = list(ex.map(one, range(args.requests)))
+    wall = time.perf_counter() - t0
+    latencies = [r[0] * 1000.0 for r in results]
+    calls = dict(standin.calls)
+    upstream_total = sum(calls.values())
+    upstream_status = {str(k): v for k, v in standin.status.items()}
+
+    # memória: uma requisição isolada sob tracemalloc (não contamina as latências acima)
+    if args.mode == "cold":
+        reset_caches(m)
+    tracemalloc.start()
+    one(None)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    standin.stop()
+
+    return {
+        "params": {
+            "slate_date": ds.slate_date, "slate_fixtures": len(ds.by_date.get(ds.slate_date, [])),
+            "dataset": args.data or f"synth(fixtures={args.fixtures}, seed={args.seed})",
+            "mode": args.mode, "requests": args.requests, "concurrency": concurrency, "workers": args.workers,
+            "last": args.last, "latency_ms": args.latency_ms, "jitter_ms": args.jitter_ms,
+            "rate_per_minute": args.rate_per_minute, "query": args.query, "cache_backend": args.cache_backend,
+        },
+        "latency_ms": {
+            "p50": round(percentile(latencies, 0.50), 2),
+            "p90": round(percentile(latencies, 0.90), 2),
+            "p99": round(percentile(latencies, 0.99), 2),
+            "mean": round(statistics.fmean(latencies), 2),
+            "max": round(max(latencies), 2),
+        },
+        "throughput_rps": round(args.requests / wall, 3) if wall else 0.0,
+        "status": {str(s): sum(1 for r in results if r[1] == s) for s in sorted({r[1] for r in results})},
+        "response_bytes": round(statistics.fmean(r[2] for r in results)),
+        "upstream": {
+            "calls": upstream_total,
+            "calls_per_request": round(upstream_total / args.requests, 2),
+            "by_kind": calls,
+            "status": upstream_status,
+            "bytes": standin.bytes_sent,
+        },
+        "memory": {
+            "peak_traced_mb": round(peak / 1e6, 2),
+            "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0, 1),
+        },
+    }
+
+# métricas comparadas com o baseline: maior é pior
+WATCHED = (("latency_ms", "p50"), ("latency_ms", "p90"), ("upstream", "calls_per_request"),
+           ("memory", "peak_traced_mb"))
+
+# folga absoluta: poucas chamadas variam com a coalescência (singleflight) entre requisições concorrentes
+ABSOLUTE_SLACK = {"calls_per_request": 0.5}
+
+def compare(report, baseline, tolerance):
+    regressions = []
+    for group, key in WATCHED:
+        new, old = report[group][key], baseline.get(group, {}).get(key)
+        if old and new > old * (1 + tolerance) and new - old > ABSOLUTE_SLACK.get(key, 0):
+            regressions.append(f"{group}.{key}: {old} -> {new} (+{(new / old - 1) * 100:.0f}%)")
+    if report["throughput_rps"] < baseline.get("throughput_rps", 0) * (1 - tolerance):
+        regressions.append(f"throughput_rps: {baseline['throughput_rps']} -> {report['throughput_rps']}")
+    return regressions
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark offline de /api/filtro contra o stand-in da API-Football")
+    ap.add_argument("--data", help="dataset gravado (JSON no formato de bench/synth.py)")
+    ap.add_argument("--fixtures", type=int, default=100, help="tamanho do slate sintético (50-1000)")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--live-ratio", type=float, default=0.0)
+    ap.add_argument("--requests", type=int, default=20)
+    ap.add_argument("--concurrency", type=int, default=4)
+    ap.add_argument("--workers", type=int, default=8, help="?workers= do endpoint")
+    ap.add_argument("--last", default="5")
+    ap.add_argument("--mode", choices=("cold", "warm"), default="cold",
+                    help="cold: caches zerados a cada requisição; warm: caches/warehouse mantidos")
+    ap.add_argument("--query", default="", help="parâmetros extras, ex.: 'stats=1&bulk=1&compact=1'")
+    ap.add_argument("--latency-ms", type=float, default=40.0)
+    ap.add_argument("--jitter-ms", type=float, default=10.0)
+    ap.add_argument("--rate-per-minute", type=int, default=0, help="0 = sem limite no stand-in")
+    ap.add_argument("--cache-backend", choices=("memory", "sqlite", "redis"))
+    ap.add_argument("--json", help="grava o relatório neste arquivo")
+    ap.add_argument("--baseline", help="relatório anterior para comparar")
+    ap.add_argument("--tolerance", type=float, default=0.15)
+    args = ap.parse_args()
+
+    report = run(args)
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2, ensure_ascii=False)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as fh:
+            regressions = compare(report, json.load(fh), args.tolerance)
+        if regressions:
+            print("REGRESSÕES:\n  " + "\n  ".join(regressions), file=sys.stderr)
+            sys.exit(1)
+        print("sem regressões em relação ao baseline", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
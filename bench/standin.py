@@ -0,0 +1,145 @@
+# bench/standin.py
+# Stand-in local da API-Football servindo um Dataset (gravado ou sintético) com latência e
+# limite de taxa configuráveis, para medir /api/filtro sem gastar cota real
+
+import collections
+import json
+import random
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+class StandIn:
+    def __init__(self, dataset, latency_ms=40.0, jitter_ms=10.0, rate_per_minute=0, daily_limit=75000, seed=1):
+        self.dataset = dataset
+        self.latency = latency_ms / 1000.0
+        self.jitter = jitter_ms / 1000.0
+        self.rate_per_minute = rate_per_minute
+        self.daily_limit = daily_limit
+        self.daily_used = 0
+        self._rnd = random.Random(seed)
+        self._lock = threading.Lock()
+        self._tokens = float(rate_per_minute)
+        self._refill_at = time.monotonic()
+        self.calls = collections.Counter()
+        self.status = collections.Counter()
+        self.bytes_sent = 0
+        self.server = None
+
+    def reset_counters(self):
+        with self._lock:
+            self.calls.clear()
+            self.status.clear()
+            self.bytes_sent = 0
+
+    def _delay(self):
+        with self._lock:
+            return max(0.0, self.latency + self._rnd.uniform(-self.jitter, self.jitter))
+
+    def _admit(self):
+        # token bucket por minuto, como o plano da API: sem token vira 429 com Retry-After
+        with self._lock:
+            self.daily_used += 1
+            if not self.rate_per_minute:
+                return True, None, None
+            now = time.monotonic()
+            self._tokens = min(self.rate_per_minute,
+                               self._tokens + (now - self._refill_at) * self.rate_per_minute / 60.0)
+            self._refill_at = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True, int(self._tokens), None
+            retry = (1 - self._tokens) * 60.0 / self.rate_per_minute
+            return False, 0, max(1, int(retry + 0.999))
+
+    def respond(self, path, q):
+        ds = self.dataset
+        if path == "/fixtures/statistics":
+            return ds.statistics.get(int(q.get("fixture", 0)), [])
+        if path != "/fixtures":
+            return []
+        if "date" in q:
+            return ds.by_date.get(q["date"], [])
+        if "team" in q:
+            return ds.team_last(int(q["team"]), int(q.get("last", 10)))
+        if "ids" in q:
+            out = []
+            for fid in q["ids"].split("-"):
+                f = ds.by_id.get(int(fid))
+                if f is not None:
+                    out.append(dict(f, statistics=ds.statistics.get(int(fid), [])))
+            return out
+        if "league" in q:
+            return ds.by_league.get((int(q["league"]), int(q.get("season", 0))), [])
+        if "live" in q:
+            return [f for f in ds.by_date.get(ds.slate_date, [])
+                    if f["fixture"]["status"]["short"] in ("1H", "HT", "2H")]
+        return []
+
+    def serve(self, port=0):
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                u = urlparse(self.path)
+                q = {k: v[0] for k, v in parse_qs(u.query).items()}
+                kind = u.path + "?" + ",".join(sorted(q))
+                time.sleep(standin._delay())
+                ok, remaining, retry = standin._admit()
+                if ok:
+                    status = 200
+                    body = json.dumps({"response": standin.respond(u.path, q)}, separators=(",", ":")).encode()
+                else:
+                    status = 429
+                    body = b'{"errors":{"rateLimit":"Too many requests"},"response":[]}'
+                with standin._lock:
+                    standin.calls[kind] += 1
+                    standin.status[status] += 1
+                    standin.bytes_sent += len(body)
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                if standin.rate_per_minute:
+                    self.send_header("X-RateLimit-Limit", str(standin.rate_per_minute))
+                    self.send_header("X-RateLimit-Remaining", str(remaining))
+                self.send_header("x-ratelimit-requests-limit", str(standin.daily_limit))
+                self.send_header("x-ratelimit-requests-remaining", str(max(0, standin.daily_limit - standin.daily_used)))
+                if retry:
+                    self.send_header("Retry-After", str(retry))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return f"http://127.0.0.1:{self.server.server_port}"
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+
+if __name__ == "__main__":
+    import argparse
+    from synth import Dataset, generate
+    ap = argparse.ArgumentParser(description="Sobe o stand-in da API-Football")
+    ap.add_argument("--data", help="dataset gravado (JSON); sem ele usa o gerador sintético")
+    ap.add_argument("--fixtures", type=int, default=100)
+    ap.add_argument("--port", type=int, default=8787)
+    ap.add_argument("--latency-ms", type=float, default=40.0)
+    ap.add_argument("--jitter-ms", type=float, default=10.0)
+    ap.add_argument("--rate-per-minute", type=int, default=0)
+    args = ap.parse_args()
+    ds = Dataset.load(args.data) if args.data else generate(args.fixtures)
+    url = StandIn(ds, args.latency_ms, args.jitter_ms, args.rate_per_minute).serve(args.port)
+    print(f"stand-in em {url} (slate {ds.slate_date}); Ctrl+C para sair")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,112 @@
+# bench/synth.py
+# Gerador sintético de slates no formato da API-Football (/fixtures e /fixtures/statistics),
+# determinístico pela seed: mesmo (fixtures, seed) gera sempre os mesmos bytes
+
+import datetime as dt
+import json
+import random
+
+TEAMS_PER_LEAGUE = 20
+HISTORY_ROUNDS = 12
+ROUND_EVERY_DAYS = 3
+
+class Dataset:
+    # fixtures (históricos + slate) e statistics por fixture, com os índices que o stand-in consulta
+    def __init__(self, fixtures, statistics, slate_date):
+        self.fixtures = fixtures
+        self.statistics = {int(k): v for k, v in statistics.items()}
+        self.slate_date = slate_date
+        self.by_id = {f["fixture"]["id"]: f for f in fixtures}
+        self.by_date = {}
+        self.by_team = {}
+        self.by_league = {}
+        for f in sorted(fixtures, key=lambda x: x["fixture"]["timestamp"], reverse=True):
+            self.by_date.setdefault(f["fixture"]["date"][:10], []).append(f)
+            self.by_league.setdefault((f["league"]["id"], f["league"]["season"]), []).append(f)
+            for side in ("home", "away"):
+                self.by_team.setdefault(f["teams"][side]["id"], []).append(f)
+        for day in self.by_date.values():
+            day.sort(key=lambda x: (x["fixture"]["timestamp"], x["fixture"]["id"]))
+
+    def team_last(self, team_id, last):
+        # `last` da API: só jogos encerrados, mais recente primeiro
+        done = [f for f in self.by_team.get(team_id, []) if f["fixture"]["status"]["short"] == "FT"]
+        return done[:last]
+
+    def to_json(self):
+        return {"slate_date": self.slate_date, "fixtures": self.fixtures,
+                "statistics": {str(k): v for k, v in self.statistics.items()}}
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding="utf-8") as fh:
+            data = json.load(fh)
+        return cls(data["fixtures"], data.get("statistics", {}), data["slate_date"])
+
+    def dump(self, path):
+        with open(path, "w", encoding="utf-8") as fh:
+            json.dump(self.to_json(), fh, ensure_ascii=False, separators=(",", ":"))
+
+def _statistics(rnd, fixture):
+    out = []
+    for side in ("home", "away"):
+        shots = rnd.randint(4, 22)
+        out.append({"team": fixture["teams"][side], "statistics": [
+            {"type": "Shots on Goal", "value": rnd.randint(0, min(shots, 9))},
+            {"type": "Total Shots", "value": shots},
+            {"type": "Ball Possession", "value": f"{rnd.randint(30, 70)}%"},
+            {"type": "expected_goals", "value": f"{rnd.random() * 2.5:.2f}"},
+        ]})
+    return out
+
+def generate(fixtures=100, seed=1, slate_date="2025-12-06", live_ratio=0.0, rounds=HISTORY_ROUNDS):
+    # `fixtures` jogos no slate (ligas de 20 times, 10 jogos por rodada) e `rounds` rodadas
+    # anteriores encerradas, uma a cada ROUND_EVERY_DAYS dias. `live_ratio` marca parte do slate como 1H
+    rnd = random.Random(seed)
+    leagues = max(1, -(-fixtures // (TEAMS_PER_LEAGUE // 2)))
+    day0 = dt.datetime.fromisoformat(slate_date).replace(hour=15, tzinfo=dt.timezone.utc)
+    out, stats = [], {}
+    next_id = 500000
+    in_slate = 0
+    for lg in range(leagues):
+        league_id = 1000 + lg
+        teams = [league_id * 100 + i for i in range(TEAMS_PER_LEAGUE)]
+        league = {"id": league_id, "name": f"Liga {league_id}", "country": f"País {lg % 12}", "season": 2025}
+        for rnd_no in range(rounds, -1, -1):
+            kickoff = day0 - dt.timedelta(days=rnd_no * ROUND_EVERY_DAYS)
+            order = teams[:]
+            rnd.shuffle(order)
+            for i in range(0, TEAMS_PER_LEAGUE, 2):
+                if rnd_no == 0:
+                    if in_slate >= fixtures:
+                        break
+                    in_slate += 1
+                next_id += 1
+                home, away = order[i], order[i + 1]
+                ts = kickoff + dt.timedelta(minutes=15 * (i // 2))
+                finished = rnd_no > 0
+                status = "FT" if finished else ("1H" if rnd.random() < live_ratio else "NS")
+                ht = (rnd.randint(0, 2), rnd.randint(0, 2)) if finished else (None, None)
+                f = {
+                    "fixture": {"id": next_id, "date": ts.isoformat(), "timestamp": int(ts.timestamp()),
+                                "status": {"short": status, "elapsed": 90 if finished else None}},
+                    "league": dict(league),
+                    "teams": {"home": {"id": home, "name": f"Time {home}"}, "away": {"id": away, "name": f"Time {away}"}},
+                    "goals": {"home": (ht[0] + rnd.randint(0, 2)) if finished else None,
+                              "away": (ht[1] + rnd.randint(0, 1)) if finished else None},
+                    "score": {"halftime": {"home": ht[0], "away": ht[1]}},
+                }
+                out.append(f)
+                stats[next_id] = _statistics(rnd, f) if finished else []
+    return Dataset(out, stats, slate_date)
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Gera um dataset sintético no formato gravado do bench")
+    ap.add_argument("--fixtures", type=int, default=100)
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--date", default="2025-12-06")
+    ap.add_argument("--live-ratio", type=float, default=0.0)
+    ap.add_argument("out")
+    args = ap.parse_args()
+    generate(args.fixtures, args.seed, args.date, args.live_ratio).dump(args.out)